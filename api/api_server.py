@@ -5,16 +5,24 @@ Serves random videos from the pool with 1-second rotation.
 Designed to run on Render.com free tier.
 """
 
+import time
+
+IMPORT_STARTED = time.perf_counter()
+
 import os
+import hmac
 import json
 import random
 import threading
-import time
 import logging
-from datetime import datetime
-from flask import Flask, jsonify, request
+from datetime import datetime, timezone
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
-import requests
+
+from profiling import NULL_TIMER, RequestTimer, SamplingProfiler
+from rate_limit import TokenBucketLimiter, client_ip_from_forwarded
+from sampling import ExposureWeightedSampler, view_weight
+from sharding import HashRing, parse_shard_nodes, shard_pool_file
 
 # Configure advanced logging
 logging.basicConfig(
@@ -35,6 +43,42 @@ log.setLevel(logging.WARNING)
 GITHUB_REPO = os.environ.get('GITHUB_REPO', 'bitm4ncer/UnseenStream')
 POOL_REFRESH_MINUTES = int(os.environ.get('POOL_REFRESH_MINUTES', 60))
 GITHUB_RAW_URL = f'https://raw.githubusercontent.com/{GITHUB_REPO}/main/videos_pool.json'
+POOL_URL = os.environ.get('POOL_URL', GITHUB_RAW_URL)  # Override for mirrors and local benchmarks
+EXPOSURE_HALF_LIFE_MINUTES = float(os.environ.get('EXPOSURE_HALF_LIFE_MINUTES', 30))
+EXPOSURE_REBUILD_SECONDS = int(os.environ.get('EXPOSURE_REBUILD_SECONDS', 60))
+POOL_RETRY_SECONDS = 30  # Retry interval while the pool is still empty
+
+# Abuse protection for /current-video
+RATE_LIMIT_PER_SECOND = float(os.environ.get('RATE_LIMIT_PER_SECOND', 5))
+RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', 20))
+RATE_LIMIT_MAX_CLIENTS = int(os.environ.get('RATE_LIMIT_MAX_CLIENTS', 10000))
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 1))  # Proxies in front of us; 1 = Render's router
+MAX_EXCLUDED_IDS = int(os.environ.get('MAX_EXCLUDED_IDS', 1500))  # Frontend keeps the last 1000 viewed
+MAX_REQUEST_BYTES = int(os.environ.get('MAX_REQUEST_BYTES', 64 * 1024))
+
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
+
+# Admin/profiling surface (disabled unless ADMIN_TOKEN is set)
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+MAX_PROFILE_SECONDS = 300
+
+# Sharded mode: this node holds only the videos the hash ring assigns to SHARD_NAME
+# and serves /shard/* for coordinator.py (see docs/SHARDING.md)
+SHARD_NAME = os.environ.get('SHARD_NAME', '')
+SHARD_NODES = parse_shard_nodes(os.environ.get('SHARD_NODES', ''))
+SHARD_TOKEN = os.environ.get('SHARD_TOKEN', '')
+if SHARD_NAME and SHARD_NAME not in SHARD_NODES:
+    raise ValueError(f"SHARD_NAME {SHARD_NAME!r} must be listed in SHARD_NODES")
+if SHARD_NAME and not SHARD_TOKEN:
+    # Shard nodes are public; an open /shard/served would let anyone push videos out of rotation
+    raise ValueError("SHARD_TOKEN must be set when SHARD_NAME is set")
+shard_ring = HashRing(SHARD_NODES) if SHARD_NAME else None
+if shard_ring:
+    # Fetch only this shard's file (written by the discovery job when SHARD_NODES is set);
+    # '{shard}' in SHARD_POOL_URL is replaced with SHARD_NAME
+    POOL_URL = os.environ.get(
+        'SHARD_POOL_URL', shard_pool_file(GITHUB_RAW_URL, '{shard}')
+    ).replace('{shard}', SHARD_NAME)
 
 # Global state
 current_video = None
@@ -43,19 +87,48 @@ pool_last_updated = None
 videos_served = 0
 server_started = datetime.utcnow()
 rotator_started = False
+rotator_lock = threading.Lock()
+first_request_seen = False
+
+# Startup instrumentation (seconds, measured from this process's start: module
+# import, or the fork for a preloaded Gunicorn worker). A forked worker keeps
+# the master's import/preload timings under 'master'
+startup_timings = {}
+worker_started = IMPORT_STARTED
+
+# Served-count feedback: weights drop for videos we served recently
+sampler = ExposureWeightedSampler(view_weight, half_life_seconds=EXPOSURE_HALF_LIFE_MINUTES * 60)
+
+rate_limiter = TokenBucketLimiter(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, max_keys=RATE_LIMIT_MAX_CLIENTS)
+rate_limited_requests = 0
+
+# Runtime diagnostics, toggled via /admin endpoints (per worker process)
+profiler = SamplingProfiler()
+server_timing_enabled = os.environ.get('SERVER_TIMING', '').lower() in ('1', 'true', 'yes')
 
 
 def fetch_video_pool():
     """Fetch the video pool from GitHub"""
     global video_pool, pool_last_updated
+    # Imported here: only the pool fetch needs it, and with a preloaded
+    # Gunicorn master the workers never pay for the import themselves
+    import requests
 
     try:
-        logger.info(f"Fetching video pool from {GITHUB_RAW_URL}")
-        response = requests.get(GITHUB_RAW_URL, timeout=10)
+        logger.info(f"Fetching video pool from {POOL_URL}")
+        response = requests.get(POOL_URL, timeout=10)
         response.raise_for_status()
 
         data = response.json()
-        video_pool = data.get('videos', [])
+        pool = data.get('videos', [])
+        if shard_ring:
+            # Guards against a shard file written for a different SHARD_NODES
+            total = len(pool)
+            pool = [v for v in pool if shard_ring.node_for(v.get('id', '')) == SHARD_NAME]
+            if len(pool) < total:
+                logger.warning(f"Shard {SHARD_NAME}: dropped {total - len(pool)} of {total} videos owned by other shards")
+        sampler.load(pool)
+        video_pool = pool
         pool_last_updated = datetime.utcnow()
 
         logger.info(f"Successfully loaded {len(video_pool)} videos from pool")
@@ -100,17 +173,31 @@ def select_weighted_video(pool, excluded_ids=None):
         available_pool = pool
 
     # Calculate weights: (101 - viewCount) so 0 views = weight 101, 100 views = weight 1
-    weights = []
-    for video in available_pool:
-        view_count = video.get('viewCount', 0)
-        weight = 101 - min(view_count, 100)  # Ensure weight is always positive
-        weights.append(weight)
+    weights = [view_weight(video) for video in available_pool]
 
     # Use random.choices() for weighted selection
     selected = random.choices(available_pool, weights=weights, k=1)[0]
     return selected
 
 
+def serve_weighted_video(excluded_ids=None):
+    """
+    Select a video to serve and record the exposure.
+    Same weighting as select_weighted_video(), divided by (1 + decayed
+    served count) so recently served videos are less likely to come up again.
+
+    Args:
+        excluded_ids: Set of video IDs to exclude (already viewed)
+
+    Returns:
+        Selected video object or None
+    """
+    selected = sampler.select(excluded_ids)
+    if selected is not None:
+        sampler.record_served(selected)
+    return selected
+
+
 def video_rotator():
     """
     Background thread that picks a weighted random video every second.
@@ -120,20 +207,39 @@ def video_rotator():
     global current_video, videos_served
 
     logger.info("Video rotator thread started with weighted selection")
-    last_pool_refresh = time.time()
+    # Count from when the pool was actually fetched: a worker Gunicorn respawns
+    # inherits the master's pool, which can be much older than this thread
+    if pool_last_updated:
+        last_pool_refresh = pool_last_updated.replace(tzinfo=timezone.utc).timestamp()
+    else:
+        last_pool_refresh = time.time()
+    last_exposure_rebuild = time.time()
     rotation_count = 0
 
     while True:
         try:
-            # Refresh pool periodically
-            if time.time() - last_pool_refresh > (POOL_REFRESH_MINUTES * 60):
+            # Refresh pool periodically (and keep retrying while it is empty)
+            if time.time() - last_pool_refresh > (POOL_REFRESH_MINUTES * 60) or \
+                    (not video_pool and time.time() - last_pool_refresh > POOL_RETRY_SECONDS):
                 logger.info("Refreshing video pool (scheduled refresh)")
                 fetch_video_pool()
                 last_pool_refresh = time.time()
 
+            # Let exposure decay lift weights of videos we haven't served lately
+            if time.time() - last_exposure_rebuild > EXPOSURE_REBUILD_SECONDS:
+                sampler.rebuild()
+                last_exposure_rebuild = time.time()
+
+            # Shard nodes don't rotate: the coordinator serves and reports exposure
+            # through /shard/served, and a rotation on each of N shards would
+            # inflate every video's exposure N-fold
+            if shard_ring:
+                time.sleep(1)
+                continue
+
             # Pick weighted random video if pool is available
             if video_pool:
-                current_video = select_weighted_video(video_pool)
+                current_video = serve_weighted_video()
                 videos_served += 1
                 rotation_count += 1
 
@@ -158,32 +264,111 @@ def video_rotator():
             time.sleep(1)
 
 
+def seconds_since_import():
+    return round(time.perf_counter() - IMPORT_STARTED, 3)
+
+
+def seconds_since_worker_start():
+    return round(time.perf_counter() - worker_started, 3)
+
+
+def mark_worker_started():
+    """
+    Restart the startup clock in a freshly forked Gunicorn worker (gunicorn.conf.py).
+    Without this, a worker respawned hours after boot would report its
+    startup as hours long.
+    """
+    global worker_started
+    worker_started = time.perf_counter()
+    master = dict(startup_timings)
+    startup_timings.clear()
+    startup_timings['master'] = master
+
+
+def load_initial_pool():
+    """Fetch the pool for the first time, recording how long it took"""
+    logger.info("Initializing video pool...")
+    started = time.perf_counter()
+    loaded = fetch_video_pool()
+    startup_timings['initial_pool_fetch_seconds'] = round(time.perf_counter() - started, 3)
+    startup_timings['pool_ready_seconds'] = seconds_since_worker_start() if loaded else None
+    return loaded
+
+
+def preload_pool():
+    """
+    Load the pool in the Gunicorn master before workers fork (gunicorn.conf.py).
+    Workers then share the parsed pool copy-on-write instead of each
+    downloading it on their first request.
+    """
+    startup_timings['preloaded'] = True
+    return load_initial_pool()
+
+
+def rotator_main():
+    """Rotator thread entry point: load the pool if needed, then rotate"""
+    if not video_pool:
+        load_initial_pool()
+    video_rotator()
+
+
 def ensure_rotator_started():
-    """Ensure video rotator is running (for Gunicorn compatibility)"""
+    """
+    Ensure video rotator is running (for Gunicorn compatibility).
+    Thread-safe and non-blocking: the initial pool fetch (if the pool wasn't
+    preloaded) happens on the rotator thread, and /current-video answers 503
+    until it completes.
+    """
     global rotator_started
-    if not rotator_started:
+    if rotator_started:
+        return
+    with rotator_lock:
+        if rotator_started:
+            return
         logger.info("="*60)
         logger.info("UnseenStream API Server v0.1")
         logger.info(f"GitHub Repo: {GITHUB_REPO}")
         logger.info(f"Pool refresh interval: {POOL_REFRESH_MINUTES} minutes")
+        logger.info(f"Pool preloaded: {bool(video_pool)} ({len(video_pool)} videos)")
         logger.info("="*60)
 
-        # Initial pool fetch
-        logger.info("Initializing video pool...")
-        fetch_video_pool()
-
         # Start video rotator in background thread
-        rotator_thread = threading.Thread(target=video_rotator, daemon=True)
+        rotator_thread = threading.Thread(target=rotator_main, name='video-rotator', daemon=True)
         rotator_thread.start()
         logger.info("Video rotator started (1 video/second)")
 
+        startup_timings['rotator_started_seconds'] = seconds_since_worker_start()
         rotator_started = True
 
 
 @app.before_request
 def before_request():
     """Initialize rotator on first request (Gunicorn compatibility)"""
+    global first_request_seen
     ensure_rotator_started()
+    if not first_request_seen:
+        first_request_seen = True
+        startup_timings['first_request_seconds'] = seconds_since_worker_start()
+        logger.info(f"Startup timings: {startup_timings}")
+    if server_timing_enabled:
+        g.timer = RequestTimer()
+
+
+@app.after_request
+def add_server_timing(response):
+    """Attach Server-Timing spans when per-request timing is enabled"""
+    if server_timing_enabled and 'timer' in g:
+        response.headers['Server-Timing'] = g.timer.header()
+    return response
+
+
+@app.errorhandler(413)
+def request_too_large(error):
+    """Reject oversized POST bodies before they are parsed"""
+    return jsonify({
+        'error': 'Request too large',
+        'message': f'Request body is limited to {MAX_REQUEST_BYTES} bytes'
+    }), 413
 
 
 @app.route('/health')
@@ -209,8 +394,24 @@ def get_current_video():
     {
         "excluded_ids": ["video_id_1", "video_id_2", ...]
     }
+
+    Requests are rate limited per client IP (429) and excluded_ids is capped
+    at MAX_EXCLUDED_IDS (413).
     """
-    client_ip = request.headers.get('X-Forwarded-For', request.remote_addr)
+    global rate_limited_requests
+    timer = g.get('timer', NULL_TIMER) if server_timing_enabled else NULL_TIMER
+    client_ip = client_ip_from_forwarded(request.headers.get('X-Forwarded-For'), request.remote_addr, TRUSTED_PROXIES)
+
+    allowed, retry_after = rate_limiter.allow(client_ip)
+    if not allowed:
+        rate_limited_requests += 1
+        logger.debug(f"Rate limited {client_ip} (retry in {retry_after:.1f}s)")
+        response = jsonify({
+            'error': 'Too many requests',
+            'message': f'Rate limit is {RATE_LIMIT_PER_SECOND:g} requests/second per client'
+        })
+        response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+        return response, 429
 
     if not video_pool:
         logger.warning(f"Video request from {client_ip} - pool empty")
@@ -222,12 +423,26 @@ def get_current_video():
     # Get excluded IDs from POST request
     excluded_ids = None
     if request.method == 'POST':
-        data = request.get_json() or {}
-        excluded_ids = set(data.get('excluded_ids', []))
+        with timer.span('parse'):
+            data = request.get_json(silent=True) or {}
+        raw_ids = data.get('excluded_ids', []) if isinstance(data, dict) else []
+        if not isinstance(raw_ids, list):
+            return jsonify({
+                'error': 'Invalid request',
+                'message': 'excluded_ids must be a list of video IDs'
+            }), 400
+        if len(raw_ids) > MAX_EXCLUDED_IDS:
+            logger.warning(f"Video request from {client_ip} - {len(raw_ids)} excluded IDs (max {MAX_EXCLUDED_IDS})")
+            return jsonify({
+                'error': 'Too many excluded IDs',
+                'message': f'excluded_ids is limited to {MAX_EXCLUDED_IDS} entries'
+            }), 413
+        excluded_ids = {vid for vid in raw_ids if isinstance(vid, str)}
         logger.debug(f"Client sent {len(excluded_ids)} excluded IDs")
 
     # Select weighted random video
-    selected_video = select_weighted_video(video_pool, excluded_ids)
+    with timer.span('selection'):
+        selected_video = serve_weighted_video(excluded_ids)
 
     if selected_video is None:
         logger.warning(f"Video request from {client_ip} - selection failed")
@@ -237,7 +452,68 @@ def get_current_video():
         }), 500
 
     logger.debug(f"Served video to {client_ip}: {selected_video.get('title', 'Unknown')[:50]} (Views: {selected_video.get('viewCount', 'N/A')})")
-    return jsonify(selected_video)
+    with timer.span('serialization'):
+        response = jsonify(selected_video)
+    return response
+
+
+def shard_guard():
+    """Return an error response unless this node serves /shard endpoints for the caller"""
+    if not shard_ring:
+        return jsonify({'error': 'Not found'}), 404
+    if not hmac.compare_digest(
+            request.headers.get('X-Shard-Token', '').encode(), SHARD_TOKEN.encode()):
+        return jsonify({'error': 'Unauthorized'}), 401
+    return None
+
+
+@app.route('/shard/pick', methods=['POST'])
+def shard_pick():
+    """
+    Weighted pick from this shard for the coordinator.
+    Exposure is not recorded here; the coordinator reports the pick it
+    actually served via /shard/served.
+
+    POST body: {"excluded_ids": [...]} (only IDs owned by this shard)
+
+    Returns:
+        {"shard", "video", "weight", "exhausted"} where weight is this shard's
+        total sampling weight after exclusions
+    """
+    denied = shard_guard()
+    if denied:
+        return denied
+
+    data = request.get_json(silent=True) or {}
+    raw_ids = data.get('excluded_ids', []) if isinstance(data, dict) else []
+    if not isinstance(raw_ids, list) or len(raw_ids) > MAX_EXCLUDED_IDS:
+        return jsonify({'error': 'Invalid excluded_ids'}), 400
+    excluded_ids = {vid for vid in raw_ids if isinstance(vid, str)}
+
+    video, weight, exhausted = sampler.sample(excluded_ids)
+    return jsonify({
+        'shard': SHARD_NAME,
+        'video': video,
+        'weight': weight,
+        'exhausted': exhausted
+    })
+
+
+@app.route('/shard/served', methods=['POST'])
+def shard_served():
+    """Record that the coordinator served one of this shard's videos"""
+    global videos_served
+    denied = shard_guard()
+    if denied:
+        return denied
+
+    data = request.get_json(silent=True) or {}
+    video_id = data.get('id') if isinstance(data, dict) else None
+    if not isinstance(video_id, str):
+        return jsonify({'error': 'Missing id'}), 400
+    sampler.record_served({'id': video_id})
+    videos_served += 1
+    return '', 204
 
 
 @app.route('/stats')
@@ -250,12 +526,83 @@ def get_stats():
         'pool_size': len(video_pool),
         'pool_last_updated': pool_last_updated.isoformat() + 'Z' if pool_last_updated else None,
         'videos_served': videos_served,
+        'exposure_tracked_videos': len(sampler.tracker),
+        'exposure_half_life_minutes': EXPOSURE_HALF_LIFE_MINUTES,
+        'rate_limited_requests': rate_limited_requests,
+        'tracked_clients': len(rate_limiter),
         'server_started': server_started.isoformat() + 'Z',
         'uptime_seconds': (datetime.utcnow() - server_started).total_seconds(),
-        'github_repo': GITHUB_REPO
+        'github_repo': GITHUB_REPO,
+        'startup': startup_timings,
+        'shard': {'name': SHARD_NAME, 'nodes': SHARD_NODES} if shard_ring else None
     })
 
 
+def admin_authorized():
+    """Check the admin bearer token (constant-time)"""
+    supplied = request.headers.get('Authorization', '')
+    if supplied.startswith('Bearer '):
+        supplied = supplied[len('Bearer '):]
+    else:
+        supplied = request.headers.get('X-Admin-Token', '')
+    return hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode())
+
+
+def admin_guard():
+    """Return an error response unless the request may use /admin endpoints"""
+    if not ADMIN_TOKEN:
+        # Admin surface is disabled entirely without a token
+        return jsonify({'error': 'Not found'}), 404
+    if not admin_authorized():
+        logger.warning(f"Rejected admin request from {request.headers.get('X-Forwarded-For', request.remote_addr)}")
+        return jsonify({'error': 'Unauthorized'}), 401
+    return None
+
+
+@app.route('/admin/profile', methods=['GET', 'POST'])
+def admin_profile():
+    """
+    Sampling profiler for this worker process.
+
+    POST ?seconds=30&interval_ms=5   Start a profiling window (runs in the background)
+    GET                              Window status as JSON
+    GET ?format=folded               Aggregated stacks in folded format (flamegraph.pl, speedscope)
+    """
+    denied = admin_guard()
+    if denied:
+        return denied
+
+    if request.method == 'POST':
+        seconds = min(request.args.get('seconds', 30, type=float), MAX_PROFILE_SECONDS)
+        interval_ms = max(request.args.get('interval_ms', 5, type=float), 1)
+        if not profiler.start(seconds, interval_ms / 1000):
+            return jsonify({'error': 'Profiler already running', **profiler.status()}), 409
+        logger.info(f"Profiling started for {seconds:g}s at {interval_ms:g}ms intervals")
+        return jsonify(profiler.status()), 202
+
+    if request.args.get('format') == 'folded':
+        return Response(profiler.folded(), mimetype='text/plain')
+    return jsonify(profiler.status())
+
+
+@app.route('/admin/timing', methods=['GET', 'POST'])
+def admin_timing():
+    """
+    Toggle Server-Timing headers (parse/selection/serialization/total) for this worker.
+
+    POST ?enabled=1|0
+    """
+    global server_timing_enabled
+    denied = admin_guard()
+    if denied:
+        return denied
+
+    if request.method == 'POST':
+        server_timing_enabled = request.args.get('enabled', '1').lower() in ('1', 'true', 'yes', 'on')
+        logger.info(f"Server-Timing headers {'enabled' if server_timing_enabled else 'disabled'}")
+    return jsonify({'server_timing_enabled': server_timing_enabled})
+
+
 @app.route('/')
 def index():
     """Root endpoint with API documentation"""
@@ -275,6 +622,10 @@ def index():
     })
 
 
+# Everything above runs at import time (in the Gunicorn master when preloading)
+startup_timings['module_import_seconds'] = seconds_since_import()
+
+
 def main():
     """Initialize and start the server"""
     logger.info("="*60)
@@ -285,8 +636,7 @@ def main():
     logger.info("="*60)
 
     # Initial pool fetch
-    logger.info("Initializing video pool...")
-    if not fetch_video_pool():
+    if not load_initial_pool():
         logger.warning("Could not fetch initial pool. Will retry in background.")
         # Create a minimal pool to prevent errors
         global video_pool
@@ -298,10 +648,10 @@ def main():
             'viewCount': 0,
             'publishedAt': datetime.utcnow().isoformat() + 'Z'
         }]
+        sampler.load(video_pool)
 
     # Start video rotator in background thread
-    rotator_thread = threading.Thread(target=video_rotator, daemon=True)
-    rotator_thread.start()
+    ensure_rotator_started()
 
     # Start Flask server
     port = int(os.environ.get('PORT', 5000))
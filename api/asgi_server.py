@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+UnseenStream API Server v0.1 (async mode)
+Same endpoints as api_server.py, served as an ASGI app under uvicorn.
+The rotator and pool refresh run as asyncio tasks and the pool is fetched
+with a non-blocking HTTP client, so slow clients don't hold a whole worker.
+
+Run with:
+    cd api && uvicorn asgi_server:app --host 0.0.0.0 --port $PORT
+"""
+
+import os
+import json
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import httpx
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from rate_limit import TokenBucketLimiter, client_ip_from_forwarded
+from sampling import ExposureWeightedSampler, view_weight
+
+# Configure advanced logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+# Configuration
+GITHUB_REPO = os.environ.get('GITHUB_REPO', 'bitm4ncer/UnseenStream')
+POOL_REFRESH_MINUTES = int(os.environ.get('POOL_REFRESH_MINUTES', 60))
+GITHUB_RAW_URL = f'https://raw.githubusercontent.com/{GITHUB_REPO}/main/videos_pool.json'
+POOL_URL = os.environ.get('POOL_URL', GITHUB_RAW_URL)  # Override for mirrors and local benchmarks
+EXPOSURE_HALF_LIFE_MINUTES = float(os.environ.get('EXPOSURE_HALF_LIFE_MINUTES', 30))
+EXPOSURE_REBUILD_SECONDS = int(os.environ.get('EXPOSURE_REBUILD_SECONDS', 60))
+POOL_RETRY_SECONDS = 30  # Retry interval while the pool is still empty
+
+# Abuse protection for /current-video
+RATE_LIMIT_PER_SECOND = float(os.environ.get('RATE_LIMIT_PER_SECOND', 5))
+RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', 20))
+RATE_LIMIT_MAX_CLIENTS = int(os.environ.get('RATE_LIMIT_MAX_CLIENTS', 10000))
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 1))  # Proxies in front of us; 1 = Render's router
+MAX_EXCLUDED_IDS = int(os.environ.get('MAX_EXCLUDED_IDS', 1500))  # Frontend keeps the last 1000 viewed
+MAX_REQUEST_BYTES = int(os.environ.get('MAX_REQUEST_BYTES', 64 * 1024))
+
+# Global state (single event loop per worker, no locking needed around these)
+current_video = None
+video_pool = []
+pool_last_updated = None
+videos_served = 0
+server_started = datetime.utcnow()
+
+sampler = ExposureWeightedSampler(view_weight, half_life_seconds=EXPOSURE_HALF_LIFE_MINUTES * 60)
+
+rate_limiter = TokenBucketLimiter(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, max_keys=RATE_LIMIT_MAX_CLIENTS)
+rate_limited_requests = 0
+
+
+def client_ip_of(request):
+    """Client IP, honouring Render's X-Forwarded-For header"""
+    return client_ip_from_forwarded(
+        request.headers.get('x-forwarded-for'),
+        request.client.host if request.client else None,
+        TRUSTED_PROXIES
+    )
+
+
+async def read_limited_body(request):
+    """Read the request body, or return None if it exceeds MAX_REQUEST_BYTES"""
+    declared = request.headers.get('content-length')
+    if declared and declared.isdigit() and int(declared) > MAX_REQUEST_BYTES:
+        return None
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > MAX_REQUEST_BYTES:
+            return None
+    return bytes(body)
+
+
+async def fetch_video_pool(client):
+    """Fetch the video pool from GitHub without blocking the event loop"""
+    global video_pool, pool_last_updated
+
+    try:
+        logger.info(f"Fetching video pool from {POOL_URL}")
+        response = await client.get(POOL_URL, timeout=10)
+        response.raise_for_status()
+
+        # Parsing a large pool and building its weights are CPU-bound; keep them
+        # off the event loop (the sampler only takes its lock to swap the new tree in)
+        data = await asyncio.to_thread(json.loads, response.content)
+        pool = data.get('videos', [])
+        await asyncio.to_thread(sampler.load, pool)
+        video_pool = pool
+        pool_last_updated = datetime.utcnow()
+
+        logger.info(f"Successfully loaded {len(video_pool)} videos from pool")
+        return True
+    except httpx.TimeoutException:
+        logger.error(f"Timeout fetching video pool (>10s)")
+        return False
+    except httpx.HTTPError as e:
+        logger.error(f"Request error fetching video pool: {e}")
+        return False
+    except json.JSONDecodeError as e:
+        logger.error(f"Invalid JSON in video pool: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Unexpected error fetching video pool: {e}", exc_info=True)
+        return False
+
+
+def serve_weighted_video(excluded_ids=None):
+    """Select a video to serve and record the exposure"""
+    selected = sampler.select(excluded_ids)
+    if selected is not None:
+        sampler.record_served(selected)
+    return selected
+
+
+async def pool_refresher(client):
+    """
+    Background task that fetches the pool, then refreshes it every
+    POOL_REFRESH_MINUTES (every POOL_RETRY_SECONDS while it is still empty)
+    """
+    await fetch_video_pool(client)
+    while True:
+        await asyncio.sleep(POOL_REFRESH_MINUTES * 60 if video_pool else POOL_RETRY_SECONDS)
+        logger.info("Refreshing video pool (scheduled refresh)")
+        await fetch_video_pool(client)
+
+
+async def video_rotator():
+    """
+    Background task that picks a weighted random video every second.
+    Async counterpart of api_server.video_rotator().
+    """
+    global current_video, videos_served
+
+    logger.info("Video rotator task started with weighted selection")
+    loop = asyncio.get_running_loop()
+    last_exposure_rebuild = loop.time()
+    rotation_count = 0
+
+    while True:
+        try:
+            if loop.time() - last_exposure_rebuild > EXPOSURE_REBUILD_SECONDS:
+                await asyncio.to_thread(sampler.rebuild)
+                last_exposure_rebuild = loop.time()
+
+            if video_pool:
+                current_video = serve_weighted_video()
+                videos_served += 1
+                rotation_count += 1
+
+                logger.info(f"[Rotation #{rotation_count}] Selected: '{current_video.get('title', 'Unknown')[:60]}' (ID: {current_video.get('id', 'N/A')}, Views: {current_video.get('viewCount', 'N/A')})")
+
+                if rotation_count % 100 == 0:
+                    logger.info(f"=== Summary: {rotation_count} rotations | Pool size: {len(video_pool)} | Total served: {videos_served} ===")
+            else:
+                logger.warning("Video pool is empty")
+                current_video = {
+                    'error': 'No videos in pool',
+                    'message': 'Video pool is empty. GitHub Actions may be building it.'
+                }
+        except Exception as e:
+            logger.error(f"Error in video rotator: {e}", exc_info=True)
+
+        await asyncio.sleep(1)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Start the pool fetch, refresher and rotator tasks for this worker"""
+    logger.info("="*60)
+    logger.info("UnseenStream API Server v0.1 (async)")
+    logger.info(f"GitHub Repo: {GITHUB_REPO}")
+    logger.info(f"Pool refresh interval: {POOL_REFRESH_MINUTES} minutes")
+    logger.info("="*60)
+
+    async with httpx.AsyncClient() as client:
+        # Don't hold up startup on GitHub; endpoints return 503 until the pool arrives
+        tasks = [
+            asyncio.create_task(pool_refresher(client)),
+            asyncio.create_task(video_rotator()),
+        ]
+        logger.info("Video rotator started (1 video/second)")
+        try:
+            yield
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def health(request):
+    """Health check endpoint for Render.com and keepalive pings"""
+    logger.debug(f"Health check from {client_ip_of(request)}")
+
+    return JSONResponse({
+        'status': 'healthy',
+        'pool_size': len(video_pool),
+        'uptime_seconds': (datetime.utcnow() - server_started).total_seconds()
+    })
+
+
+async def get_current_video(request):
+    """
+    Get a weighted random video from the pool.
+    POST method allows sending excluded video IDs to prevent duplicates.
+    Rate limited per client IP; excluded_ids is capped at MAX_EXCLUDED_IDS.
+    """
+    global rate_limited_requests
+    client_ip = client_ip_of(request)
+
+    allowed, retry_after = rate_limiter.allow(client_ip)
+    if not allowed:
+        rate_limited_requests += 1
+        logger.debug(f"Rate limited {client_ip} (retry in {retry_after:.1f}s)")
+        return JSONResponse({
+            'error': 'Too many requests',
+            'message': f'Rate limit is {RATE_LIMIT_PER_SECOND:g} requests/second per client'
+        }, status_code=429, headers={'Retry-After': str(max(1, int(retry_after + 0.999)))})
+
+    if not video_pool:
+        logger.warning(f"Video request from {client_ip} - pool empty")
+        return JSONResponse({
+            'error': 'No videos available',
+            'message': 'Video pool is empty. GitHub Actions may be building it.'
+        }, status_code=503)
+
+    excluded_ids = None
+    if request.method == 'POST':
+        body = await read_limited_body(request)
+        if body is None:
+            return JSONResponse({
+                'error': 'Request too large',
+                'message': f'Request body is limited to {MAX_REQUEST_BYTES} bytes'
+            }, status_code=413)
+        try:
+            data = json.loads(body) if body else {}
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            data = {}
+        raw_ids = data.get('excluded_ids', []) if isinstance(data, dict) else []
+        if not isinstance(raw_ids, list):
+            return JSONResponse({
+                'error': 'Invalid request',
+                'message': 'excluded_ids must be a list of video IDs'
+            }, status_code=400)
+        if len(raw_ids) > MAX_EXCLUDED_IDS:
+            logger.warning(f"Video request from {client_ip} - {len(raw_ids)} excluded IDs (max {MAX_EXCLUDED_IDS})")
+            return JSONResponse({
+                'error': 'Too many excluded IDs',
+                'message': f'excluded_ids is limited to {MAX_EXCLUDED_IDS} entries'
+            }, status_code=413)
+        excluded_ids = {vid for vid in raw_ids if isinstance(vid, str)}
+        logger.debug(f"Client sent {len(excluded_ids)} excluded IDs")
+
+    selected_video = serve_weighted_video(excluded_ids)
+
+    if selected_video is None:
+        logger.warning(f"Video request from {client_ip} - selection failed")
+        return JSONResponse({
+            'error': 'Selection failed',
+            'message': 'Could not select a video from the pool'
+        }, status_code=500)
+
+    logger.debug(f"Served video to {client_ip}: {selected_video.get('title', 'Unknown')[:50]} (Views: {selected_video.get('viewCount', 'N/A')})")
+    return JSONResponse(selected_video)
+
+
+async def get_stats(request):
+    """Get statistics about the video pool and server"""
+    logger.info(f"Stats request from {client_ip_of(request)}")
+
+    return JSONResponse({
+        'pool_size': len(video_pool),
+        'pool_last_updated': pool_last_updated.isoformat() + 'Z' if pool_last_updated else None,
+        'videos_served': videos_served,
+        'exposure_tracked_videos': len(sampler.tracker),
+        'exposure_half_life_minutes': EXPOSURE_HALF_LIFE_MINUTES,
+        'rate_limited_requests': rate_limited_requests,
+        'tracked_clients': len(rate_limiter),
+        'server_started': server_started.isoformat() + 'Z',
+        'uptime_seconds': (datetime.utcnow() - server_started).total_seconds(),
+        'github_repo': GITHUB_REPO,
+        'server_mode': 'asgi'
+    })
+
+
+async def index(request):
+    """Root endpoint with API documentation"""
+    logger.info(f"API root accessed from {client_ip_of(request)}")
+
+    return JSONResponse({
+        'name': 'UnseenStream API',
+        'version': '0.1.0',
+        'endpoints': {
+            '/current-video': 'Get current random video (rotates every second)',
+            '/stats': 'Get pool statistics',
+            '/health': 'Health check'
+        },
+        'pool_size': len(video_pool),
+        'status': 'running'
+    })
+
+
+app = Starlette(
+    routes=[
+        Route('/health', health),
+        Route('/current-video', get_current_video, methods=['GET', 'POST']),
+        Route('/stats', get_stats),
+        Route('/', index),
+    ],
+    middleware=[
+        # Enable CORS for all routes
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*']),
+    ],
+    lifespan=lifespan,
+)
+
+
+def main():
+    """Start the async server with uvicorn"""
+    import uvicorn
+
+    port = int(os.environ.get('PORT', 5000))
+    logger.info(f"Server starting on port {port} (async mode)")
+    uvicorn.run(app, host='0.0.0.0', port=port, access_log=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+UnseenStream Shard Coordinator v0.1
+Thin front end for sharded mode: each API node (api_server.py with SHARD_NAME)
+holds only its consistent-hash slice of the pool, and this server combines
+their weighted picks.
+
+Every request fans out to all shards in parallel. Each shard returns one
+weighted pick plus its total weight W_s (after exclusions); the coordinator
+keeps shard s with probability W_s / sum(W). A video v in shard s therefore
+comes up with probability (W_s / W) * (w_v / W_s) = w_v / W, the same
+distribution select_weighted_video gives over the whole pool.
+
+Run with:
+    cd api && SHARD_URLS=a=http://127.0.0.1:5001,b=http://127.0.0.1:5002 \\
+        gunicorn coordinator:app
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import Flask, jsonify, request
+from flask_cors import CORS
+import requests
+
+from rate_limit import TokenBucketLimiter, client_ip_from_forwarded
+from sharding import HashRing, parse_shard_urls
+
+# Configure advanced logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+app = Flask(__name__)
+CORS(app)  # Enable CORS for all routes
+
+log = logging.getLogger('werkzeug')
+log.setLevel(logging.WARNING)
+
+# Configuration
+SHARDS = parse_shard_urls(os.environ.get('SHARD_URLS', ''))
+SHARD_TOKEN = os.environ.get('SHARD_TOKEN', '')
+SHARD_TIMEOUT_SECONDS = float(os.environ.get('SHARD_TIMEOUT_SECONDS', 2))
+RATE_LIMIT_PER_SECOND = float(os.environ.get('RATE_LIMIT_PER_SECOND', 5))
+RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', 20))
+RATE_LIMIT_MAX_CLIENTS = int(os.environ.get('RATE_LIMIT_MAX_CLIENTS', 10000))
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 1))
+MAX_EXCLUDED_IDS = int(os.environ.get('MAX_EXCLUDED_IDS', 1500))
+MAX_REQUEST_BYTES = int(os.environ.get('MAX_REQUEST_BYTES', 64 * 1024))
+
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
+
+if not SHARDS:
+    raise ValueError("SHARD_URLS must list at least one shard (name=url,...)")
+if not SHARD_TOKEN:
+    raise ValueError("SHARD_TOKEN must be set (the shards reject /shard/* requests without it)")
+
+# Must match the SHARD_NODES the API nodes were started with
+ring = HashRing(list(SHARDS))
+
+# Global state
+videos_served = 0
+shard_errors = 0
+shards_unfinished = 0  # Shards still working when the fan-out deadline passed
+server_started = datetime.utcnow()
+
+session = requests.Session()
+session.headers['X-Shard-Token'] = SHARD_TOKEN
+# Fire-and-forget exposure reports only; picks never wait behind them
+report_executor = ThreadPoolExecutor(max_workers=max(2, len(SHARDS)))
+rate_limiter = TokenBucketLimiter(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, max_keys=RATE_LIMIT_MAX_CLIENTS)
+
+
+def fan_out(calls, timeout):
+    """
+    Run one call per shard concurrently, each on its own thread, so no
+    shard's call ever waits in a queue behind other requests' calls.
+
+    Args:
+        calls: Dict of shard name -> zero-argument callable
+        timeout: Seconds to wait for all calls
+
+    Returns:
+        (results, errors, unfinished): results and exceptions by shard name,
+        and the names of shards whose call was still running at the deadline
+    """
+    results = {}
+    errors = {}
+
+    def run(name, call):
+        try:
+            results[name] = call()
+        except Exception as e:
+            errors[name] = e
+
+    threads = [threading.Thread(target=run, args=item, daemon=True) for item in calls.items()]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(deadline - time.monotonic(), 0))
+
+    # Late finishers may still write; work on copies
+    results, errors = dict(results), dict(errors)
+    unfinished = [name for name in calls if name not in results and name not in errors]
+    return results, errors, unfinished
+
+
+def shard_pick(name, excluded_ids):
+    response = session.post(f'{SHARDS[name]}/shard/pick',
+                            json={'excluded_ids': excluded_ids},
+                            timeout=SHARD_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return response.json()
+
+
+def report_served(name, video_id):
+    """Tell the owning shard its video was served (exposure feedback)"""
+    try:
+        session.post(f'{SHARDS[name]}/shard/served', json={'id': video_id},
+                     timeout=SHARD_TIMEOUT_SECONDS)
+    except requests.exceptions.RequestException as e:
+        logger.debug(f"Could not report served video to shard {name}: {e}")
+
+
+def select_across_shards(excluded_ids=None):
+    """
+    Weighted pick across all shards.
+    Excluded IDs are routed only to the shard that owns them. If every shard
+    has run out of unexcluded videos, fall back to their full-pool picks
+    (the same reset select_weighted_video does).
+
+    Returns:
+        Selected video object or None
+    """
+    global shard_errors, shards_unfinished
+    parts = ring.partition(excluded_ids or ())
+    results, errors, unfinished = fan_out(
+        {name: (lambda name=name: shard_pick(name, parts[name])) for name in SHARDS},
+        timeout=SHARD_TIMEOUT_SECONDS + 1
+    )
+
+    for name, error in errors.items():
+        shard_errors += 1
+        logger.warning(f"Shard {name} failed: {error}")
+    for name in unfinished:
+        shards_unfinished += 1
+        logger.warning(f"Shard {name} did not answer within {SHARD_TIMEOUT_SECONDS + 1:g}s; skipped for this draw")
+
+    picks = [pick for pick in results.values() if pick.get('video') and pick.get('weight', 0) > 0]
+
+    if not picks:
+        return None
+
+    available = [p for p in picks if not p['exhausted']]
+    candidates = available or picks
+    chosen = random.choices(candidates, weights=[p['weight'] for p in candidates], k=1)[0]
+    report_executor.submit(report_served, chosen['shard'], chosen['video'].get('id'))
+    return chosen['video']
+
+
+def shard_health():
+    """Health of every shard, fetched in parallel"""
+    def fetch(name):
+        try:
+            response = session.get(f'{SHARDS[name]}/health', timeout=SHARD_TIMEOUT_SECONDS)
+            response.raise_for_status()
+            return response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            return {'status': 'unreachable', 'error': str(e)}
+
+    results, _, unfinished = fan_out({name: (lambda name=name: fetch(name)) for name in SHARDS},
+                                     timeout=SHARD_TIMEOUT_SECONDS + 1)
+    for name in unfinished:
+        results[name] = {'status': 'unreachable', 'error': 'timed out'}
+    return results
+
+
+@app.errorhandler(413)
+def request_too_large(error):
+    """Reject oversized POST bodies before they are parsed"""
+    return jsonify({
+        'error': 'Request too large',
+        'message': f'Request body is limited to {MAX_REQUEST_BYTES} bytes'
+    }), 413
+
+
+@app.route('/health')
+def health():
+    """Health check: healthy while at least one shard is"""
+    shards = shard_health()
+    healthy = [s for s in shards.values() if s.get('status') == 'healthy']
+    return jsonify({
+        'status': 'healthy' if healthy else 'degraded',
+        'pool_size': sum(s.get('pool_size', 0) for s in healthy),
+        'shards_healthy': len(healthy),
+        'shards_total': len(shards),
+        'uptime_seconds': (datetime.utcnow() - server_started).total_seconds()
+    }), 200 if healthy else 503
+
+
+@app.route('/current-video', methods=['GET', 'POST'])
+def get_current_video():
+    """
+    Get a weighted random video from the sharded pool.
+    Same request/response contract as api_server.py.
+    """
+    global videos_served
+    client_ip = client_ip_from_forwarded(request.headers.get('X-Forwarded-For'), request.remote_addr, TRUSTED_PROXIES)
+
+    allowed, retry_after = rate_limiter.allow(client_ip)
+    if not allowed:
+        response = jsonify({
+            'error': 'Too many requests',
+            'message': f'Rate limit is {RATE_LIMIT_PER_SECOND:g} requests/second per client'
+        })
+        response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+        return response, 429
+
+    excluded_ids = None
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        raw_ids = data.get('excluded_ids', []) if isinstance(data, dict) else []
+        if not isinstance(raw_ids, list):
+            return jsonify({
+                'error': 'Invalid request',
+                'message': 'excluded_ids must be a list of video IDs'
+            }), 400
+        if len(raw_ids) > MAX_EXCLUDED_IDS:
+            return jsonify({
+                'error': 'Too many excluded IDs',
+                'message': f'excluded_ids is limited to {MAX_EXCLUDED_IDS} entries'
+            }), 413
+        excluded_ids = list({vid for vid in raw_ids if isinstance(vid, str)})
+
+    selected_video = select_across_shards(excluded_ids)
+
+    if selected_video is None:
+        logger.warning(f"Video request from {client_ip} - no shard returned a video")
+        return jsonify({
+            'error': 'No videos available',
+            'message': 'Video pool is empty. GitHub Actions may be building it.'
+        }), 503
+
+    videos_served += 1
+    return jsonify(selected_video)
+
+
+@app.route('/stats')
+def get_stats():
+    """Aggregate statistics across shards"""
+    shards = shard_health()
+    return jsonify({
+        'pool_size': sum(s.get('pool_size', 0) for s in shards.values()),
+        'videos_served': videos_served,
+        'shard_errors': shard_errors,
+        'shards_unfinished': shards_unfinished,
+        'shards': shards,
+        'server_started': server_started.isoformat() + 'Z',
+        'uptime_seconds': (datetime.utcnow() - server_started).total_seconds()
+    })
+
+
+@app.route('/')
+def index():
+    """Root endpoint with API documentation"""
+    return jsonify({
+        'name': 'UnseenStream API (sharded)',
+        'version': '0.1.0',
+        'endpoints': {
+            '/current-video': 'Get current random video (rotates every second)',
+            '/stats': 'Get pool statistics',
+            '/health': 'Health check'
+        },
+        'shards': list(SHARDS),
+        'status': 'running'
+    })
+
+
+def main():
+    """Start the coordinator with Flask's development server"""
+    port = int(os.environ.get('PORT', 5000))
+    logger.info("="*60)
+    logger.info("UnseenStream Shard Coordinator v0.1")
+    logger.info(f"Shards: {', '.join(f'{name}={url}' for name, url in SHARDS.items())}")
+    logger.info(f"Server starting on port {port}")
+    logger.info("="*60)
+    app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""
+Gunicorn configuration for the UnseenStream API.
+
+    cd api && gunicorn -c gunicorn.conf.py api_server:app
+
+The app is imported and the video pool fetched once in the master process;
+forked workers share the parsed pool copy-on-write and start serving
+immediately instead of each downloading it on their first request.
+"""
+
+import gc
+import os
+
+# Import the app (and its pool) in the master before forking workers
+preload_app = True
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+
+
+def when_ready(server):
+    """Master is up and the app is imported: fetch the pool before workers fork"""
+    import api_server
+
+    if not api_server.preload_pool():
+        server.log.warning("Pool preload failed; workers will fetch it in the background")
+
+    # Move the pool into the permanent generation so the cyclic GC in each
+    # worker doesn't touch (and copy) the shared pages
+    gc.freeze()
+    server.log.info(f"Startup timings (master): {api_server.startup_timings}")
+
+
+def post_fork(server, worker):
+    """Start the rotator thread in each worker (threads don't survive fork)"""
+    import api_server
+
+    api_server.mark_worker_started()
+    api_server.ensure_rotator_started()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+UnseenStream runtime profiling hooks.
+A sampling profiler that can be switched on for a time window and reports
+folded stacks (flamegraph.pl / speedscope input), plus per-request timing
+spans for Server-Timing headers. Both are inert until enabled.
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class SamplingProfiler:
+    """
+    Periodically samples every thread's stack via sys._current_frames()
+    and aggregates them as folded stacks: "outer;inner;leaf count".
+    One profiling window at a time; nothing runs between windows.
+    """
+
+    def __init__(self, max_depth=64):
+        self.max_depth = max_depth
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.finished_at = None
+        self.duration = None
+        self.interval = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, duration, interval=0.005):
+        """
+        Start a profiling window in the background.
+
+        Returns:
+            False if a window is already running
+        """
+        with self.lock:
+            if self.running:
+                return False
+            self.stacks = Counter()
+            self.samples = 0
+            self.duration = duration
+            self.interval = interval
+            self.started_at = datetime.utcnow()
+            self.finished_at = None
+            self.thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self.thread.start()
+            return True
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        deadline = time.monotonic() + self.duration
+        while time.monotonic() < deadline:
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            folded = [self._fold(frame, names.get(thread_id, str(thread_id)))
+                      for thread_id, frame in sys._current_frames().items()
+                      if thread_id != own_id]
+            with self.lock:
+                self.stacks.update(folded)
+                self.samples += 1
+            time.sleep(self.interval)
+        self.finished_at = datetime.utcnow()
+
+    def _fold(self, frame, thread_name):
+        parts = []
+        while frame is not None and len(parts) < self.max_depth:
+            code = frame.f_code
+            parts.append(f'{code.co_name} ({code.co_filename.rsplit("/", 1)[-1]}:{code.co_firstlineno})')
+            frame = frame.f_back
+        parts.append(thread_name)
+        parts.reverse()
+        return ';'.join(parts)
+
+    def folded(self):
+        """Aggregated stacks, one "frame;frame;frame count" line each"""
+        with self.lock:
+            stacks = self.stacks.copy()
+        return '\n'.join(f'{stack} {count}' for stack, count in stacks.most_common()) + '\n'
+
+    def status(self):
+        return {
+            'running': self.running,
+            'samples': self.samples,
+            'unique_stacks': len(self.stacks),
+            'duration_seconds': self.duration,
+            'interval_ms': self.interval * 1000 if self.interval else None,
+            'started_at': self.started_at.isoformat() + 'Z' if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() + 'Z' if self.finished_at else None,
+        }
+
+
+class RequestTimer:
+    """Collects named spans for one request and renders a Server-Timing header"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+
+    @contextmanager
+    def span(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((name, time.perf_counter() - started))
+
+    def header(self):
+        total = time.perf_counter() - self.started
+        parts = [f'{name};dur={seconds * 1000:.3f}' for name, seconds in self.spans]
+        parts.append(f'total;dur={total * 1000:.3f}')
+        return ', '.join(parts)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullTimer:
+    """Stand-in used while timing is disabled; every span is a shared no-op"""
+
+    _span = _NullSpan()
+
+    def span(self, name):
+        return self._span
+
+
+NULL_TIMER = NullTimer()
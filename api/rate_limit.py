@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+UnseenStream request protection.
+In-process per-client token buckets (LRU-bounded), shared by the Flask
+(api_server.py), ASGI (asgi_server.py) and coordinator servers.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def client_ip_from_forwarded(forwarded_for, remote_addr, trusted_proxies=1):
+    """
+    Resolve the client IP from an X-Forwarded-For header.
+    Clients can send their own X-Forwarded-For; proxies append the address
+    they saw to the right of it, so only entries counted from the right
+    can be trusted.
+
+    Args:
+        forwarded_for: Raw X-Forwarded-For header value (or None)
+        remote_addr: Socket peer address, used when the header is missing
+        trusted_proxies: N > 0 = use the Nth entry from the right, i.e. the
+            address seen by the outermost of N proxies (1 on Render);
+            0 = use the left-most entry. Client-controlled, so only for
+            deployments without a proxy in front that never see the header
+            from untrusted clients
+
+    Returns:
+        Client IP string
+    """
+    if not forwarded_for:
+        return remote_addr
+    hops = [hop.strip() for hop in forwarded_for.split(',') if hop.strip()]
+    if not hops:
+        return remote_addr
+    if trusted_proxies <= 0:
+        return hops[0]
+    return hops[max(len(hops) - trusted_proxies, 0)]
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket per key, refilled at `rate` tokens/second up to `burst`.
+    Keys live in an LRU; the least recently seen key is evicted once
+    `max_keys` is reached. An idle key would have refilled to a full bucket
+    anyway, so evicting it loses nothing.
+    """
+
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()  # key -> (tokens, last_refill_timestamp)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.buckets)
+
+    def allow(self, key, cost=1.0, now=None):
+        """
+        Try to take `cost` tokens from the bucket for `key`.
+
+        Returns:
+            (allowed, retry_after_seconds)
+        """
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            entry = self.buckets.get(key)
+            if entry is None:
+                tokens = self.burst
+                if len(self.buckets) >= self.max_keys:
+                    self.buckets.popitem(last=False)
+            else:
+                tokens, last = entry
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                self.buckets.move_to_end(key)
+
+            if tokens >= cost:
+                self.buckets[key] = (tokens - cost, now)
+                return True, 0.0
+
+            self.buckets[key] = (tokens, now)
+            return False, (cost - tokens) / self.rate if self.rate > 0 else float('inf')
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Run a sharded UnseenStream cluster on localhost.
+Starts a file server with a synthetic pool, N api_server.py shard processes
+and a coordinator.py in front of them. With --verify, draws picks through the
+coordinator and compares them with the single-pool weighted distribution;
+--exposure keeps exposure feedback on and compares with a single unsharded
+node instead.
+
+Run with:
+    python api/run_local_cluster.py --shards 3 --pool-size 20000 --verify 5000
+    python api/run_local_cluster.py --shards 3 --pool-size 2000 --verify 5000 --exposure
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import http.client
+from collections import Counter
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(API_DIR)
+sys.path.insert(0, API_DIR)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'benchmarks'))
+
+from run_benchmarks import generate_pool, start_file_server  # noqa: E402
+from sampling import view_weight  # noqa: E402
+from sharding import HashRing, shard_pool_file  # noqa: E402
+
+
+def get_json(port, path):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        conn.request('GET', path)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def wait_healthy(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            status, data = get_json(port, '/health')
+            if status == 200 and data.get('pool_size'):
+                return data
+        except (OSError, ValueError, http.client.HTTPException):
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f'Server on port {port} did not become healthy')
+
+
+def spawn(script, env, quiet):
+    output = subprocess.DEVNULL if quiet else None
+    return subprocess.Popen([sys.executable, script], cwd=API_DIR,
+                            env=dict(os.environ, **env), stdout=output, stderr=output)
+
+
+def draw_buckets(port, draws):
+    """Draw videos through a server and count them per 10-view bucket"""
+    observed = Counter()
+    for _ in range(draws):
+        status, video = get_json(port, '/current-video')
+        if status != 200:
+            raise RuntimeError(f'/current-video returned {status}: {video}')
+        observed[video['viewCount'] // 10] += 1
+    return observed
+
+
+def verify(port, pool, draws, reference_port=None):
+    """
+    Compare coordinator picks with the single-pool distribution: the static
+    per-view-count weights, or (with exposure feedback on) the picks of a
+    single unsharded node drawn the same way
+    """
+    if reference_port:
+        expected = draw_buckets(reference_port, draws)
+    else:
+        expected = Counter()
+        for video in pool:
+            expected[video['viewCount'] // 10] += view_weight(video)
+    total_expected = sum(expected.values())
+
+    observed = draw_buckets(port, draws)
+
+    print(f"\n{'views':>9} {'expected':>9} {'observed':>9}")
+    distance = 0.0
+    for bucket in sorted(set(expected) | set(observed)):
+        share = expected[bucket] / total_expected
+        actual = observed[bucket] / draws
+        distance += abs(share - actual) / 2
+        print(f"{bucket * 10:>4}-{bucket * 10 + 9:<4} {share:>9.4f} {actual:>9.4f}")
+    print(f"\nTotal variation distance over {draws} draws: {distance:.4f}")
+    return distance
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run a local sharded UnseenStream cluster')
+    parser.add_argument('--shards', type=int, default=3)
+    parser.add_argument('--pool-size', type=int, default=20000)
+    parser.add_argument('--base-port', type=int, default=5100,
+                        help='Coordinator port; shards use the following ports')
+    parser.add_argument('--verify', type=int, default=0,
+                        help='Draw this many videos through the coordinator, check the distribution and exit')
+    parser.add_argument('--exposure', action='store_true',
+                        help='Keep exposure feedback on for --verify and compare with a single unsharded node')
+    parser.add_argument('--quiet', action='store_true', help='Silence server logs')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    names = [f'shard{i}' for i in range(args.shards)]
+
+    workdir = tempfile.mkdtemp(prefix='unseenstream-cluster-')
+    data = generate_pool(args.pool_size)
+    with open(os.path.join(workdir, 'videos_pool.json'), 'w') as f:
+        json.dump(data, f)
+    # Per-shard files, as the discovery job writes them with SHARD_NODES set
+    for name, videos in HashRing(names).split_videos(data['videos']).items():
+        with open(os.path.join(workdir, shard_pool_file('videos_pool.json', name)), 'w') as f:
+            json.dump(dict(data, videos=videos), f)
+    file_server, base_url = start_file_server(workdir)
+
+    common = {
+        'POOL_URL': f'{base_url}/videos_pool.json',
+        'SHARD_POOL_URL': f'{base_url}/videos_pool.{{shard}}.json',
+        'RATE_LIMIT_PER_SECOND': '100000',
+        'RATE_LIMIT_BURST': '100000',
+        'SHARD_TOKEN': 'local-cluster-token',
+    }
+    if args.verify and not args.exposure:
+        # Pure view-count weights, so picks are comparable with the expected distribution
+        common['EXPOSURE_HALF_LIFE_MINUTES'] = '0'
+
+    processes = []
+    try:
+        shard_urls = []
+        for i, name in enumerate(names):
+            port = args.base_port + 1 + i
+            processes.append(spawn('api_server.py', dict(common, PORT=str(port), SHARD_NAME=name,
+                                                          SHARD_NODES=','.join(names)), args.quiet))
+            shard_urls.append(f'{name}=http://127.0.0.1:{port}')
+
+        sizes = {}
+        for i, name in enumerate(names):
+            sizes[name] = wait_healthy(args.base_port + 1 + i)['pool_size']
+
+        processes.append(spawn('coordinator.py', dict(common, PORT=str(args.base_port),
+                                                       SHARD_URLS=','.join(shard_urls)), args.quiet))
+        wait_healthy(args.base_port)
+
+        print("="*60)
+        print(f"Coordinator: http://127.0.0.1:{args.base_port}")
+        for name, size in sizes.items():
+            print(f"  {name}: {size} videos")
+        print(f"  total: {sum(sizes.values())} of {args.pool_size}")
+        print("="*60)
+
+        if args.verify:
+            reference_port = None
+            if args.exposure:
+                # Same pool and exposure settings, one node holding everything
+                reference_port = args.base_port + 1 + len(names)
+                processes.append(spawn('api_server.py', dict(common, PORT=str(reference_port)), args.quiet))
+                wait_healthy(reference_port)
+            verify(args.base_port, data['videos'], args.verify, reference_port)
+            return 0
+
+        print("Press Ctrl-C to stop")
+        while all(p.poll() is None for p in processes):
+            time.sleep(1)
+        return 1
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+        file_server.shutdown()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
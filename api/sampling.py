@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+UnseenStream weighted sampling with exposure feedback.
+Keeps per-video sampling weights in a Fenwick tree over pool positions so
+single-weight updates and weighted draws are both O(log n).
+Weights combine YouTube's view count with how often we served the video
+recently (exponentially decayed), so the same low-view videos don't get
+served over and over between discovery refreshes.
+"""
+
+import copy
+import math
+import random
+import threading
+import time
+
+
+def view_weight(video):
+    """
+    Base weight from YouTube view count.
+    0 views = weight 101, 100+ views = weight 1.
+    """
+    view_count = video.get('viewCount', 0)
+    return 101 - min(view_count, 100)  # Ensure weight is always positive
+
+
+def index_positions(pool):
+    """
+    Map each video ID to all of its positions in `pool`.
+    The discovery job dedups the pool, but a duplicate ID must still be
+    excluded (and have its exposure recorded) everywhere it appears.
+    """
+    positions = {}
+    for i, video in enumerate(pool):
+        positions.setdefault(video.get('id'), []).append(i)
+    return positions
+
+
+class FenwickTree:
+    """
+    Binary indexed tree over non-negative float weights.
+    Supports point updates, prefix sums and weighted search in O(log n).
+    """
+
+    def __init__(self, weights=()):
+        self.build(weights)
+
+    def build(self, weights):
+        """Rebuild the tree from a list of weights in O(n)"""
+        self.weights = [float(w) for w in weights]
+        self.size = len(self.weights)
+        tree = [0.0] + self.weights
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                tree[parent] += tree[i]
+        self.tree = tree
+        self._top_bit = 1 << (self.size.bit_length() - 1) if self.size else 0
+
+    def __len__(self):
+        return self.size
+
+    def get(self, index):
+        """Current weight at a 0-based position"""
+        return self.weights[index]
+
+    def set(self, index, weight):
+        """Set the weight at a 0-based position"""
+        delta = float(weight) - self.weights[index]
+        if delta == 0.0:
+            return
+        self.weights[index] = float(weight)
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, count):
+        """Sum of the first `count` weights"""
+        total = 0.0
+        i = count
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def total(self):
+        """Sum of all weights"""
+        return self.prefix_sum(self.size)
+
+    def find(self, target):
+        """
+        Return the 0-based position whose cumulative weight range contains
+        `target`, i.e. the smallest position p with prefix_sum(p + 1) > target.
+        """
+        position = 0
+        remaining = target
+        step = self._top_bit
+        while step:
+            nxt = position + step
+            if nxt <= self.size and self.tree[nxt] <= remaining:
+                position = nxt
+                remaining -= self.tree[nxt]
+            step >>= 1
+        # Guard against float drift pushing us past the end
+        return min(position, self.size - 1)
+
+
+class ExposureTracker:
+    """
+    Counts how often each video was served, with exponential time decay.
+    Counts are keyed by video ID so they survive pool refreshes.
+    A half-life of 0 disables tracking (every count stays 0).
+    """
+
+    def __init__(self, half_life_seconds):
+        self.enabled = half_life_seconds > 0
+        self.decay_rate = math.log(2) / half_life_seconds if self.enabled else 0.0
+        self.counts = {}  # video_id -> (count, last_update_timestamp)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def value(self, video_id, now=None):
+        """Decayed exposure count for a video (0.0 if never served)"""
+        entry = self.counts.get(video_id)
+        if entry is None:
+            return 0.0
+        count, updated = entry
+        if now is None:
+            now = time.time()
+        return count * math.exp(-self.decay_rate * max(now - updated, 0.0))
+
+    def snapshot(self):
+        """Independent copy of the current counts, safe to read without a lock"""
+        clone = copy.copy(self)
+        clone.counts = dict(self.counts)
+        return clone
+
+    def record(self, video_id, now=None):
+        """Record one serve of a video and return its new decayed count"""
+        if not self.enabled:
+            return 0.0
+        if now is None:
+            now = time.time()
+        count = self.value(video_id, now) + 1.0
+        self.counts[video_id] = (count, now)
+        return count
+
+    def prune(self, now=None, threshold=0.01, candidates=None):
+        """
+        Drop entries that have decayed below `threshold`.
+        `candidates` limits the check to those IDs (default: every entry).
+        """
+        if now is None:
+            now = time.time()
+        if candidates is None:
+            candidates = list(self.counts)
+        stale = [vid for vid in candidates if self.value(vid, now) < threshold]
+        for vid in stale:
+            del self.counts[vid]
+        return len(stale)
+
+
+class ExposureWeightedSampler:
+    """
+    Weighted video sampler whose weights are
+    base_weight(video) / (1 + decayed_exposure(video)).
+
+    Serving a video updates its weight in O(log n). Because decay only ever
+    raises weights of videos we haven't touched, the whole tree is rebuilt
+    periodically (O(n)) via rebuild() to let rested videos recover.
+
+    load() and rebuild() compute the new tree without holding the lock and
+    only swap it in under the lock, so draws (including ones made on an
+    event loop) never wait for an O(n) rebuild. Serves recorded while a
+    rebuild is running are replayed onto the new tree at swap time.
+    """
+
+    def __init__(self, base_weight=view_weight, half_life_seconds=1800):
+        self.base_weight = base_weight
+        self.tracker = ExposureTracker(half_life_seconds)
+        self.lock = threading.Lock()
+        self.rebuild_lock = threading.Lock()  # Serializes load()/rebuild()
+        self.pool = []
+        self.positions = {}
+        self.tree = FenwickTree()
+        self.last_rebuild = None
+        self._served_during_rebuild = None
+
+    def __len__(self):
+        return len(self.pool)
+
+    def _weight(self, video, now):
+        exposure = self.tracker.value(video.get('id'), now)
+        return self.base_weight(video) / (1.0 + exposure)
+
+    def load(self, pool):
+        """Replace the pool and rebuild weights from current exposure counts"""
+        with self.rebuild_lock:
+            self._rebuild(pool, index_positions(pool))
+
+    def rebuild(self):
+        """Re-apply exposure decay to every weight and prune dead counters"""
+        with self.rebuild_lock:
+            with self.lock:
+                pool, positions = self.pool, self.positions
+            self._rebuild(pool, positions)
+
+    def _rebuild(self, pool, positions):
+        with self.lock:
+            self._served_during_rebuild = set()
+            snapshot = self.tracker.snapshot()
+
+        # O(n) part, lock-free: weights come from the snapshot of exposure counts
+        now = time.time()
+        tree = FenwickTree([
+            self.base_weight(v) / (1.0 + snapshot.value(v.get('id'), now)) for v in pool
+        ])
+        stale = [vid for vid in snapshot.counts if snapshot.value(vid, now) < 0.01]
+
+        with self.lock:
+            served, self._served_during_rebuild = self._served_during_rebuild, None
+            # Re-check: a stale counter may have been served again meanwhile
+            self.tracker.prune(now, candidates=stale)
+            for video_id in served:
+                for position in positions.get(video_id, ()):
+                    tree.set(position, self._weight(pool[position], time.time()))
+            self.pool, self.positions, self.tree = pool, positions, tree
+            self.last_rebuild = now
+
+    def record_served(self, video):
+        """Count a serve of `video` and lower its weight accordingly"""
+        video_id = video.get('id')
+        with self.lock:
+            now = time.time()
+            exposure = self.tracker.record(video_id, now)
+            if self._served_during_rebuild is not None:
+                self._served_during_rebuild.add(video_id)
+            for position in self.positions.get(video_id, ()):
+                weight = self.base_weight(self.pool[position]) / (1.0 + exposure)
+                self.tree.set(position, weight)
+
+    def _excluded_positions(self, excluded_ids):
+        if not excluded_ids:
+            return set()
+        positions = self.positions
+        return {p for vid in excluded_ids for p in positions.get(vid, ())}
+
+    def select(self, excluded_ids=None):
+        """
+        Draw a video proportionally to its current weight.
+        Excluded videos are zeroed out for the draw and restored afterwards.
+        If every video is excluded, falls back to the full pool.
+
+        Returns:
+            Selected video object or None if the pool is empty
+        """
+        return self.sample(excluded_ids)[0]
+
+    def sample(self, excluded_ids=None):
+        """
+        Like select(), but also report the weight the draw was made from.
+
+        Returns:
+            (video or None, total_weight, exhausted) where exhausted means every
+            video was excluded and the draw fell back to the full pool
+        """
+        with self.lock:
+            if not self.pool:
+                return None, 0.0, False
+
+            excluded = self._excluded_positions(excluded_ids)
+            exhausted = len(excluded) >= len(self.pool)
+            if exhausted:
+                # All videos viewed, reset and use full pool
+                excluded = set()
+
+            saved = [(p, self.tree.get(p)) for p in excluded]
+            for position, _ in saved:
+                self.tree.set(position, 0.0)
+            try:
+                total = self.tree.total()
+                if total <= 0.0:
+                    return None, 0.0, exhausted
+                position = self.tree.find(random.random() * total)
+                if position in excluded:
+                    # Float drift landed on a zeroed slot; fall back to a plain draw
+                    candidates = [i for i in range(len(self.pool)) if i not in excluded]
+                    position = random.choices(
+                        candidates, weights=[self.tree.get(i) for i in candidates], k=1
+                    )[0]
+                return self.pool[position], total, exhausted
+            finally:
+                for position, weight in saved:
+                    self.tree.set(position, weight)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+UnseenStream pool sharding.
+Consistent hashing of video IDs onto named shards, so each API node holds
+only its slice of the pool and adding a shard moves only ~1/N of the videos.
+"""
+
+import os
+import bisect
+import hashlib
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes for an even split"""
+
+    def __init__(self, nodes, vnodes=128):
+        if not nodes:
+            raise ValueError("HashRing needs at least one node")
+        self.nodes = list(nodes)
+        points = sorted(
+            (_hash(f'{node}#{i}'), node)
+            for node in self.nodes
+            for i in range(vnodes)
+        )
+        self.hashes = [h for h, _ in points]
+        self.owners = [node for _, node in points]
+
+    def node_for(self, key):
+        """Shard name owning `key`"""
+        index = bisect.bisect(self.hashes, _hash(key)) % len(self.hashes)
+        return self.owners[index]
+
+    def partition(self, keys):
+        """Split keys into {shard_name: [keys]}"""
+        parts = {node: [] for node in self.nodes}
+        for key in keys:
+            parts[self.node_for(key)].append(key)
+        return parts
+
+    def split_videos(self, videos):
+        """Split video dicts into {shard_name: [videos]} by video ID, order preserved"""
+        parts = {node: [] for node in self.nodes}
+        for video in videos:
+            parts[self.node_for(video.get('id', ''))].append(video)
+        return parts
+
+
+def shard_pool_file(pool_file, shard):
+    """Per-shard pool file name: videos_pool.json -> videos_pool.<shard>.json"""
+    root, ext = os.path.splitext(pool_file)
+    return f'{root}.{shard}{ext}'
+
+
+def parse_shard_nodes(value):
+    """Parse a comma-separated SHARD_NODES value"""
+    return [node.strip() for node in value.split(',') if node.strip()]
+
+
+def parse_shard_urls(value):
+    """Parse SHARD_URLS ("name=url,name=url") into an ordered {name: url} dict"""
+    shards = {}
+    for entry in value.split(','):
+        if not entry.strip():
+            continue
+        name, sep, url = entry.partition('=')
+        if not sep:
+            raise ValueError(f"SHARD_URLS entry must be name=url, got {entry!r}")
+        shards[name.strip()] = url.strip().rstrip('/')
+    return shards
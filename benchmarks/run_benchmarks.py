@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+UnseenStream Benchmark Suite
+Generates synthetic pools and measures:
+  - fetch_video_pool parse time and peak memory (against a local file server)
+  - select_weighted_video / exposure sampler latency, with and without excluded_ids
+  - /current-video requests/second and latency through a local Gunicorn
+
+Results are written as JSON. Pass --baseline to compare against a previous
+run and exit non-zero on regressions.
+
+Run with:
+    pip install -r api/requirements.txt
+    python benchmarks/run_benchmarks.py --output benchmarks/results.json \\
+        --baseline benchmarks/baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import string
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+import tracemalloc
+import http.client
+from datetime import datetime, timedelta
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(REPO_ROOT, 'api')
+
+DEFAULT_SIZES = [1000, 10000, 50000, 500000]
+DEFAULT_EXCLUDED_SIZES = [0, 100, 1000]
+ID_ALPHABET = string.ascii_letters + string.digits + '-_'
+
+# Metrics where bigger is better; everything else is a latency/size (smaller is better)
+HIGHER_IS_BETTER = {'requests_per_second'}
+
+# p99 of fewer samples than this is just the slowest one or two; only medians are compared
+MIN_SAMPLES_FOR_P99 = 100
+
+
+def generate_pool(size, seed=0):
+    """Synthetic pool in the same shape video_discovery.py writes"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    videos = []
+    for i in range(size):
+        video_id = ''.join(rng.choice(ID_ALPHABET) for _ in range(11))
+        published = now - timedelta(minutes=rng.randint(0, 6 * 60))
+        videos.append({
+            'id': video_id,
+            'title': f'VID_{rng.randint(1000, 99999)}.mp4',
+            'channelTitle': f'Channel {rng.randint(1, 5000)}',
+            'thumbnail': f'https://i.ytimg.com/vi/{video_id}/mqdefault.jpg',
+            'viewCount': min(int(rng.expovariate(1 / 15.0)), 100),
+            'publishedAt': published.isoformat() + 'Z',
+            'discoveredAt': (published + timedelta(minutes=30)).isoformat() + 'Z',
+        })
+    return {
+        'last_updated': now.isoformat() + 'Z',
+        'total_videos': size,
+        'videos': videos,
+    }
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize_ms(samples):
+    return {
+        'samples': len(samples),
+        'median_ms': round(statistics.median(samples) * 1000, 4),
+        'p99_ms': round(percentile(samples, 99) * 1000, 4),
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_file_server(directory):
+    handler = partial(QuietFileHandler, directory=directory)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+class QuietFileHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def import_api_server():
+    """Import api/api_server.py without starting its rotator"""
+    if API_DIR not in sys.path:
+        sys.path.insert(0, API_DIR)
+    import logging
+    import api_server
+    # Per-fetch INFO logs would be timed along with the parse
+    logging.getLogger('api_server').setLevel(logging.WARNING)
+    return api_server
+
+
+def bench_fetch(api_server, url, repeats):
+    """Time fetch_video_pool against the local file server, then measure peak memory"""
+    api_server.POOL_URL = url
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        if not api_server.fetch_video_pool():
+            raise RuntimeError(f'fetch_video_pool failed for {url}')
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    api_server.fetch_video_pool()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = summarize_ms(timings)
+    result['peak_memory_mb'] = round(peak / (1024 * 1024), 2)
+    return result
+
+
+def bench_select(api_server, pool, excluded_sizes, time_budget):
+    """Latency of the reference selector and the exposure sampler"""
+    rng = random.Random(1)
+    ids = [v['id'] for v in pool]
+    results = {}
+    for excluded_size in excluded_sizes:
+        excluded = set(rng.sample(ids, min(excluded_size, len(ids)))) if excluded_size else None
+        for name, select in (
+            ('select_weighted_video', lambda: api_server.select_weighted_video(pool, excluded)),
+            ('sampler_select', lambda: api_server.sampler.select(excluded)),
+        ):
+            samples = []
+            deadline = time.perf_counter() + time_budget
+            while time.perf_counter() < deadline or len(samples) < 5:
+                started = time.perf_counter()
+                select()
+                samples.append(time.perf_counter() - started)
+                if len(samples) >= 5000:
+                    break
+            results[f'{name}/excluded_{excluded_size}'] = summarize_ms(samples)
+    return results
+
+
+def wait_for_pool(port, expected, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/health')
+            data = json.loads(conn.getresponse().read())
+            conn.close()
+            if data.get('pool_size') == expected:
+                return True
+        except (OSError, ValueError, http.client.HTTPException):
+            pass
+        time.sleep(0.25)
+    return False
+
+
+def bench_http(url, pool, workers, concurrency, duration, excluded_size):
+    """Drive /current-video through a local Gunicorn and record throughput/latency"""
+    port = free_port()
+    env = dict(os.environ,
+               POOL_URL=url,
+               RATE_LIMIT_PER_SECOND='1000000',
+               RATE_LIMIT_BURST='1000000')
+    process = subprocess.Popen(
+        # Same start path as production (render.yaml): preload the pool in the master
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'api_server:app',
+         '-b', f'127.0.0.1:{port}', '-w', str(workers), '--log-level', 'warning'],
+        cwd=API_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        if not wait_for_pool(port, len(pool), timeout=120):
+            raise RuntimeError('Gunicorn did not load the pool in time')
+
+        rng = random.Random(2)
+        excluded = rng.sample([v['id'] for v in pool], min(excluded_size, len(pool)))
+        body = json.dumps({'excluded_ids': excluded})
+        headers = {'Content-Type': 'application/json'}
+
+        latencies = []
+        errors = [0]
+        lock = threading.Lock()
+        stop_at = time.perf_counter() + duration
+
+        def client():
+            local = []
+            failed = 0
+            while time.perf_counter() < stop_at:
+                started = time.perf_counter()
+                try:
+                    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+                    conn.request('POST', '/current-video', body=body, headers=headers)
+                    response = conn.getresponse()
+                    response.read()
+                    conn.close()
+                    if response.status != 200:
+                        failed += 1
+                        continue
+                except (OSError, http.client.HTTPException):
+                    failed += 1
+                    continue
+                local.append(time.perf_counter() - started)
+            with lock:
+                latencies.extend(local)
+                errors[0] += failed
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        result = summarize_ms(latencies) if latencies else {'samples': 0}
+        result.update({
+            'requests_per_second': round(len(latencies) / elapsed, 1),
+            'errors': errors[0],
+            'concurrency': concurrency,
+            'workers': workers,
+            'excluded_ids': excluded_size,
+        })
+        return result
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def flatten(results, prefix=''):
+    """Flatten nested results into {'a/b/metric': value} for comparison"""
+    flat = {}
+    for key, value in results.items():
+        path = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + '/'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human-readable regressions beyond `tolerance`"""
+    regressions = []
+    current = flatten(results['results'])
+    previous = flatten(baseline.get('results', {}))
+    for path, old in previous.items():
+        metric = path.rsplit('/', 1)[-1]
+        if metric not in ('median_ms', 'p99_ms', 'peak_memory_mb', 'requests_per_second'):
+            continue
+        new = current.get(path)
+        if new is None or not old:
+            continue
+        if metric == 'p99_ms':
+            samples_path = path.rsplit('/', 1)[0] + '/samples'
+            if min(previous.get(samples_path, 0), current.get(samples_path, 0)) < MIN_SAMPLES_FOR_P99:
+                continue
+        if metric in HIGHER_IS_BETTER:
+            change = (old - new) / old
+        else:
+            change = (new - old) / old
+        if change > tolerance:
+            regressions.append(f'{path}: {old} -> {new} ({change:+.0%})')
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='UnseenStream benchmark suite')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='Comma-separated pool sizes')
+    parser.add_argument('--excluded-sizes', default=','.join(map(str, DEFAULT_EXCLUDED_SIZES)),
+                        help='Comma-separated excluded_ids sizes for selection benchmarks')
+    parser.add_argument('--fetch-repeats', type=int, default=5,
+                        help='fetch_video_pool timings per pool size (compared by median)')
+    parser.add_argument('--select-seconds', type=float, default=1.0,
+                        help='Time budget per selection benchmark')
+    parser.add_argument('--skip-http', action='store_true', help='Skip the Gunicorn throughput benchmark')
+    parser.add_argument('--http-seconds', type=float, default=10.0)
+    parser.add_argument('--http-concurrency', type=int, default=8)
+    parser.add_argument('--http-workers', type=int, default=1)
+    parser.add_argument('--http-excluded', type=int, default=100,
+                        help='excluded_ids sent with every /current-video request')
+    parser.add_argument('--output', default=os.path.join(REPO_ROOT, 'benchmarks', 'results.json'))
+    parser.add_argument('--baseline', help='Compare against this results file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative slowdown before flagging a regression (default: 0.25)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    excluded_sizes = [int(s) for s in args.excluded_sizes.split(',') if s]
+
+    print("="*60)
+    print("UnseenStream Benchmark Suite")
+    print(f"Pool sizes: {sizes}")
+    print("="*60)
+
+    api_server = import_api_server()
+    workdir = tempfile.mkdtemp(prefix='unseenstream-bench-')
+    server, base_url = start_file_server(workdir)
+
+    results = {}
+    try:
+        for size in sizes:
+            print(f"\n--- Pool size {size} ---")
+            data = generate_pool(size)
+            filename = f'videos_pool_{size}.json'
+            with open(os.path.join(workdir, filename), 'w') as f:
+                json.dump(data, f)
+            url = f'{base_url}/{filename}'
+
+            entry = {}
+            entry['fetch_video_pool'] = bench_fetch(api_server, url, args.fetch_repeats)
+            print(f"  fetch_video_pool: {entry['fetch_video_pool']}")
+
+            entry['select'] = bench_select(api_server, api_server.video_pool, excluded_sizes, args.select_seconds)
+            for name, stats in entry['select'].items():
+                print(f"  {name}: {stats}")
+
+            if not args.skip_http:
+                entry['current_video_http'] = bench_http(
+                    url, data['videos'], args.http_workers, args.http_concurrency,
+                    args.http_seconds, args.http_excluded)
+                print(f"  /current-video: {entry['current_video_http']}")
+
+            results[f'pool_{size}'] = entry
+            os.remove(os.path.join(workdir, filename))
+    finally:
+        server.shutdown()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'args': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline')},
+        },
+        'results': results,
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Wrote results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n⚠️  {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print(f"✓ No regressions beyond {args.tolerance:.0%} vs {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
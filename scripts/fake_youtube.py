@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+UnseenStream Fake YouTube Data API
+Local stand-in for the two YouTube Data API v3 calls the discovery job makes
+(search.list and videos.list), so video_discovery.py can run offline without
+burning real quota.
+
+Synthetic search results and view counts, configurable latency, error
+injection, dead (deleted/private) videos and quota accounting.
+
+Serve it and point the discovery script at it:
+    python scripts/fake_youtube.py --port 8765
+    YOUTUBE_API_ENDPOINT=http://127.0.0.1:8765/youtube/v3/ YOUTUBE_API_KEY=fake \\
+        python scripts/video_discovery.py
+
+Or simulate many hourly discovery runs in a scratch directory:
+    python scripts/fake_youtube.py --simulate-runs 200 --results-per-search 50
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Quota costs from the YouTube Data API v3 documentation
+QUOTA_COSTS = {
+    'search': 100,
+    'videos': 1,
+}
+
+SEARCH_WINDOW_HOURS = 6  # Matches video_discovery.SEARCH_WINDOW_HOURS
+
+ID_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+
+
+class FakeYouTube:
+    """
+    In-memory model of the YouTube catalogue the discovery job sees.
+    Every video gets a publish time, a starting view count and a growth rate;
+    a fraction of videos gets deleted/made private some hours after upload and
+    from then on is silently missing from videos.list.
+    """
+
+    def __init__(self, seed=0, quota=10000, latency_ms=0, jitter_ms=0,
+                 error_rate=0.0, dead_rate=0.02, repeat_rate=0.1,
+                 results_per_search=50, mean_hours_to_death=48.0):
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.quota = quota
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.dead_rate = dead_rate
+        self.repeat_rate = repeat_rate
+        self.results_per_search = results_per_search
+        self.mean_hours_to_death = mean_hours_to_death
+        self.lock = threading.Lock()
+        self.videos = {}  # video_id -> dict(published, base_views, growth, dies_at, ...)
+        self.recent_ids = []
+        self.clock_offset = timedelta(0)
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.quota_used = 0
+        self.requests = {'search': 0, 'videos': 0}
+        self.errors_injected = 0
+        self.quota_rejections = 0
+
+    def now(self):
+        return datetime.utcnow() + self.clock_offset
+
+    def advance(self, hours):
+        """Move the simulated clock forward so view counts grow"""
+        with self.lock:
+            self.clock_offset += timedelta(hours=hours)
+
+    def _new_video_id(self):
+        digest = hashlib.sha1(f'{self.seed}:{len(self.videos)}:{self.rng.random()}'.encode()).digest()
+        return ''.join(ID_ALPHABET[b % 64] for b in digest[:11])
+
+    def _create_video(self, published_after):
+        video_id = self._new_video_id()
+        window = max((self.now() - published_after).total_seconds(), 1.0)
+        published = self.now() - timedelta(seconds=self.rng.uniform(0, window))
+        self.videos[video_id] = {
+            'published': published,
+            # Most fresh uploads sit near zero views, a tail is already popular
+            'base_views': int(self.rng.expovariate(1 / 15.0)),
+            'growth': self.rng.expovariate(1 / 2.0),  # views per hour
+            'dies_at': (published + timedelta(hours=self.rng.expovariate(1 / self.mean_hours_to_death))
+                        if self.rng.random() < self.dead_rate else None),
+            'title': f'VID_{self.rng.randint(1000, 99999)}.mp4',
+            'channel': f'Channel {self.rng.randint(1, 5000)}',
+        }
+        self.recent_ids.append(video_id)
+        if len(self.recent_ids) > 5000:
+            del self.recent_ids[:1000]
+        return video_id
+
+    def is_dead(self, video_id, now=None):
+        video = self.videos.get(video_id)
+        if video is None:
+            return True
+        return video['dies_at'] is not None and (now or self.now()) >= video['dies_at']
+
+    def view_count(self, video_id):
+        video = self.videos[video_id]
+        age_hours = max((self.now() - video['published']).total_seconds() / 3600, 0.0)
+        return video['base_views'] + int(video['growth'] * age_hours)
+
+    def _snippet(self, video_id):
+        video = self.videos[video_id]
+        return {
+            'publishedAt': video['published'].replace(microsecond=0).isoformat() + 'Z',
+            'title': video['title'],
+            'channelTitle': video['channel'],
+            'thumbnails': {
+                'medium': {'url': f'https://i.ytimg.com/vi/{video_id}/mqdefault.jpg'}
+            },
+        }
+
+    def charge(self, endpoint):
+        """
+        Account quota for one call.
+
+        Returns:
+            None if the call may proceed, else an (http_status, error_body) tuple
+        """
+        with self.lock:
+            self.requests[endpoint] += 1
+            cost = QUOTA_COSTS[endpoint]
+            if self.quota_used + cost > self.quota:
+                self.quota_rejections += 1
+                return 403, error_body(403, 'quotaExceeded', 'youtube.quota',
+                                       'The request cannot be completed because you have exceeded your quota.')
+            self.quota_used += cost
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.errors_injected += 1
+                return 500, error_body(500, 'backendError', 'global', 'Backend Error (injected)')
+        return None
+
+    def search(self, params):
+        max_results = min(int(params.get('maxResults', 5)), 50, self.results_per_search)
+        # The discovery job computes publishedAfter from the wall clock, which
+        # falls behind once advance() has moved our clock; clamp the window to
+        # [now - SEARCH_WINDOW_HOURS, now] so it doesn't widen every simulated hour
+        now = self.now()
+        earliest = now - timedelta(hours=SEARCH_WINDOW_HOURS)
+        published_after = params.get('publishedAfter')
+        if published_after:
+            published_after = datetime.fromisoformat(published_after.replace('Z', ''))
+            published_after = min(max(published_after, earliest), now)
+        else:
+            published_after = earliest
+
+        with self.lock:
+            ids = []
+            for _ in range(max_results):
+                if self.recent_ids and self.rng.random() < self.repeat_rate:
+                    ids.append(self.rng.choice(self.recent_ids))
+                else:
+                    ids.append(self._create_video(published_after))
+            items = [{
+                'kind': 'youtube#searchResult',
+                'id': {'kind': 'youtube#video', 'videoId': vid},
+                'snippet': self._snippet(vid),
+            } for vid in ids]
+
+        return {'kind': 'youtube#searchListResponse', 'items': items,
+                'pageInfo': {'totalResults': len(items), 'resultsPerPage': max_results}}
+
+    def list_videos(self, params):
+        ids = [vid for vid in params.get('id', '').split(',') if vid][:50]
+        parts = params.get('part', 'snippet').split(',')
+        items = []
+        with self.lock:
+            for vid in ids:
+                # Deleted/private/unknown videos are silently left out, like the real API
+                if self.is_dead(vid):
+                    continue
+                item = {'kind': 'youtube#video', 'id': vid}
+                if 'snippet' in parts:
+                    item['snippet'] = self._snippet(vid)
+                if 'statistics' in parts:
+                    item['statistics'] = {'viewCount': str(self.view_count(vid))}
+                items.append(item)
+        return {'kind': 'youtube#videoListResponse', 'items': items,
+                'pageInfo': {'totalResults': len(items), 'resultsPerPage': len(items)}}
+
+    def stats(self):
+        with self.lock:
+            now = self.now()
+            return {
+                'quota': self.quota,
+                'quota_used': self.quota_used,
+                'requests': dict(self.requests),
+                'errors_injected': self.errors_injected,
+                'quota_rejections': self.quota_rejections,
+                'videos_known': len(self.videos),
+                'videos_dead': sum(1 for vid in self.videos if self.is_dead(vid, now)),
+                'clock': self.now().isoformat() + 'Z',
+            }
+
+
+def error_body(code, reason, domain, message):
+    """Error payload in the shape googleapiclient expects"""
+    return {'error': {'code': code, 'message': message,
+                      'errors': [{'reason': reason, 'domain': domain, 'message': message}]}}
+
+
+def make_handler(fake):
+    class FakeYouTubeHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass  # Keep load tests quiet
+
+        def _send(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=UTF-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _delay(self):
+            if fake.latency_ms or fake.jitter_ms:
+                delay = fake.latency_ms + random.uniform(-fake.jitter_ms, fake.jitter_ms)
+                time.sleep(max(delay, 0) / 1000)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            # Accept both /youtube/v3/<method> and /<method>
+            endpoint = url.path.rstrip('/').rsplit('/', 1)[-1]
+
+            if url.path.startswith('/_fake/'):
+                if endpoint == 'stats':
+                    return self._send(200, fake.stats())
+                return self._send(404, error_body(404, 'notFound', 'global', 'Unknown admin endpoint'))
+
+            if endpoint not in QUOTA_COSTS:
+                return self._send(404, error_body(404, 'notFound', 'global', f'Unknown method {url.path}'))
+
+            self._delay()
+            rejection = fake.charge(endpoint)
+            if rejection:
+                return self._send(*rejection)
+
+            if endpoint == 'search':
+                return self._send(200, fake.search(params))
+            return self._send(200, fake.list_videos(params))
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            if url.path == '/_fake/reset':
+                with fake.lock:
+                    fake.reset_counters()
+                return self._send(200, fake.stats())
+            if url.path == '/_fake/advance':
+                fake.advance(float(params.get('hours', 1)))
+                return self._send(200, fake.stats())
+            return self._send(404, error_body(404, 'notFound', 'global', 'Unknown admin endpoint'))
+
+    return FakeYouTubeHandler
+
+
+def start_server(fake, host='127.0.0.1', port=0):
+    """Start the fake API in a background thread and return (server, endpoint_url)"""
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    endpoint = f'http://{host}:{server.server_address[1]}/youtube/v3/'
+    return server, endpoint
+
+
+def simulate_runs(fake, runs, quota_reset_runs, pool_limit=None):
+    """
+    Run video_discovery.main() `runs` times against the fake API,
+    advancing the simulated clock one hour per run.
+    """
+    server, endpoint = start_server(fake)
+    os.environ['YOUTUBE_API_ENDPOINT'] = endpoint
+    os.environ.setdefault('YOUTUBE_API_KEY', 'fake-key')
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.join(repo_root, 'scripts'))
+    import video_discovery
+
+    video_discovery.API_KEY = os.environ['YOUTUBE_API_KEY']
+    video_discovery.YOUTUBE_API_ENDPOINT = endpoint
+    video_discovery.SEARCH_TERMS_FILE = os.path.join(repo_root, 'scripts', 'search_terms.txt')
+    if pool_limit:
+        video_discovery.MAX_POOL_SIZE = pool_limit
+
+    workdir = tempfile.mkdtemp(prefix='unseenstream-sim-')
+    video_discovery.POOL_FILE = os.path.join(workdir, 'videos_pool.json')
+    print(f"Simulating {runs} discovery runs against {endpoint}")
+    print(f"Pool file: {video_discovery.POOL_FILE}")
+
+    history = []
+    devnull = open(os.devnull, 'w')
+    try:
+        for run in range(1, runs + 1):
+            if quota_reset_runs and (run - 1) % quota_reset_runs == 0:
+                with fake.lock:
+                    fake.reset_counters()
+
+            started = time.perf_counter()
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                video_discovery.main()
+            finally:
+                sys.stdout = stdout
+            elapsed = time.perf_counter() - started
+
+            pool = video_discovery.load_pool()
+            with fake.lock:
+                dead_in_pool = sum(1 for v in pool if fake.is_dead(v['id']))
+            stats = fake.stats()
+            history.append({'run': run, 'seconds': round(elapsed, 3), 'pool_size': len(pool),
+                            'dead_in_pool': dead_in_pool, 'quota_used': stats['quota_used']})
+            print(f"  Run {run:4d}: pool={len(pool):6d}  dead={dead_in_pool:5d}  {elapsed:6.2f}s  "
+                  f"quota used today={stats['quota_used']}")
+            fake.advance(1)
+    finally:
+        devnull.close()
+        server.shutdown()
+
+    return history
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Offline fake of the YouTube Data API v3 for video_discovery.py')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--quota', type=int, default=10000, help='Daily quota units (default: 10000)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Mean response latency')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Uniform latency jitter (+/-)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls failing with 500')
+    parser.add_argument('--dead-rate', type=float, default=0.02, help='Fraction of videos later deleted/made private')
+    parser.add_argument('--mean-hours-to-death', type=float, default=48.0,
+                        help='Mean hours after upload before a doomed video disappears')
+    parser.add_argument('--repeat-rate', type=float, default=0.1, help='Fraction of search hits that are repeats')
+    parser.add_argument('--results-per-search', type=int, default=50)
+    parser.add_argument('--simulate-runs', type=int, default=0,
+                        help='Instead of serving, run video_discovery.py this many times (1 simulated hour each)')
+    parser.add_argument('--quota-reset-runs', type=int, default=24,
+                        help='Reset quota every N simulated runs (default: 24 = daily)')
+    parser.add_argument('--pool-limit', type=int, default=None, help='Override MAX_POOL_SIZE for the simulation')
+    parser.add_argument('--report', help='Write simulation history as JSON to this file')
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    fake = FakeYouTube(seed=args.seed, quota=args.quota, latency_ms=args.latency_ms,
+                       jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                       dead_rate=args.dead_rate, repeat_rate=args.repeat_rate,
+                       results_per_search=args.results_per_search,
+                       mean_hours_to_death=args.mean_hours_to_death)
+
+    if args.simulate_runs:
+        history = simulate_runs(fake, args.simulate_runs, args.quota_reset_runs, args.pool_limit)
+        if args.report:
+            with open(args.report, 'w') as f:
+                json.dump({'runs': history, 'fake': fake.stats()}, f, indent=2)
+            print(f"✓ Wrote report to {args.report}")
+        return
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(fake))
+    print("="*60)
+    print("UnseenStream Fake YouTube Data API")
+    print(f"Endpoint: http://{args.host}:{args.port}/youtube/v3/")
+    print(f"Quota: {args.quota} units | Latency: {args.latency_ms}±{args.jitter_ms} ms | Error rate: {args.error_rate}")
+    print(f"Admin: GET /_fake/stats, POST /_fake/reset, POST /_fake/advance?hours=N")
+    print("="*60)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+UnseenStream Pool Maintenance
+Batch engine for the discovery job's per-run pool upkeep. Loads the pool into
+typed numpy columns once and runs age filtering, view-threshold eviction,
+dedup and prioritised truncation as vectorized operations instead of
+per-video Python loops.
+"""
+
+import numpy as np
+
+
+def parse_timestamps(values):
+    """
+    Parse ISO-8601 UTC strings ('...Z') into a datetime64[us] array.
+    Missing or empty values become NaT.
+    """
+    strings = np.array([value or '' for value in values], dtype=str)
+    if strings.size == 0:
+        return np.array([], dtype='datetime64[us]')
+    return np.char.rstrip(strings, 'Z').astype('datetime64[us]')
+
+
+def to_datetime64(moment):
+    """Naive UTC datetime -> numpy datetime64[us]"""
+    return np.datetime64(moment, 'us')
+
+
+class PoolColumns:
+    """
+    Columnar view of a list of video dicts.
+    The dicts themselves are kept as-is; operations work on index arrays
+    and take() materialises the result.
+    """
+
+    def __init__(self, videos):
+        self.videos = list(videos)
+        self.ids, self.view_count, self.discovered_at, self.last_checked_at = self._columns(videos)
+
+    @staticmethod
+    def _columns(videos):
+        count = len(videos)
+        return (
+            np.array([v['id'] for v in videos], dtype=str),
+            np.fromiter((v.get('viewCount', 0) for v in videos), dtype=np.int64, count=count),
+            parse_timestamps([v.get('discoveredAt') for v in videos]),
+            parse_timestamps([v.get('lastCheckedAt') for v in videos]),
+        )
+
+    def __len__(self):
+        return len(self.videos)
+
+    def append(self, videos):
+        """
+        Add rows for `videos` (parsing only those) and return their indices
+        """
+        start = len(self.videos)
+        ids, view_count, discovered_at, last_checked_at = self._columns(videos)
+        self.videos.extend(videos)
+        self.ids = np.concatenate([self.ids, ids])
+        self.view_count = np.concatenate([self.view_count, view_count])
+        self.discovered_at = np.concatenate([self.discovered_at, discovered_at])
+        self.last_checked_at = np.concatenate([self.last_checked_at, last_checked_at])
+        return np.arange(start, len(self.videos))
+
+    def take(self, indices):
+        """Video dicts at `indices`, in that order"""
+        videos = self.videos
+        return [videos[i] for i in indices.tolist()]
+
+
+def age_filter(columns, now, max_age_hours):
+    """
+    Indices of videos discovered within `max_age_hours` of `now`
+    (all videos when max_age_hours is None).
+    """
+    if max_age_hours is None:
+        return np.arange(len(columns))
+    cutoff = to_datetime64(now) - np.timedelta64(int(max_age_hours * 3600 * 1e6), 'us')
+    # NaT compares False, so videos without a discoveredAt are dropped
+    return np.flatnonzero(columns.discovered_at >= cutoff)
+
+
+def least_recently_checked(columns, indices, count):
+    """
+    Up to `count` of `indices` with the oldest lastCheckedAt
+    (never-checked first), using a partial sort.
+    """
+    if len(indices) <= count:
+        return indices
+    if count <= 0:
+        return indices[:0]
+    # NaT is the smallest int64, so never-checked videos come first
+    keys = columns.last_checked_at[indices].view(np.int64)
+    chosen = np.argpartition(keys, count - 1)[:count]
+    return indices[chosen[np.argsort(keys[chosen], kind='stable')]]
+
+
+def split_refreshed(columns, indices, updated_ids, updated_views, max_view_count):
+    """
+    Match a videos.list refresh against `indices` and apply the view threshold.
+
+    Args:
+        updated_ids / updated_views: parallel sequences from videos.list
+        max_view_count: refreshed videos above this are evicted
+
+    Returns:
+        (refreshed_indices, refreshed_views, over_limit_indices) where the
+        refreshed_* pair covers the videos that stay in the pool
+    """
+    if not len(updated_ids) or not len(indices):
+        empty = indices[:0]
+        return empty, np.array([], dtype=np.int64), empty
+
+    updated_ids = np.asarray(updated_ids, dtype=str)
+    updated_views = np.asarray(updated_views, dtype=np.int64)
+    order = np.argsort(updated_ids)
+    sorted_ids = updated_ids[order]
+
+    ids = columns.ids[indices]
+    slot = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    found = sorted_ids[slot] == ids
+    refreshed = indices[found]
+    views = updated_views[order][slot[found]]
+
+    over = views > max_view_count
+    return refreshed[~over], views[~over], refreshed[over]
+
+
+def drop(indices, removed):
+    """`indices` without any of `removed`, order preserved"""
+    if not len(removed):
+        return indices
+    return indices[~np.isin(indices, removed)]
+
+
+def dedup_first(ids):
+    """Indices of the first occurrence of each ID, in original order"""
+    if len(ids) == 0:
+        return np.array([], dtype=np.int64)
+    _, first = np.unique(ids, return_index=True)
+    return np.sort(first)
+
+
+def priority_order(columns, indices):
+    """
+    Order `indices` best-first: lowest view count, then most recently discovered.
+    """
+    views = columns.view_count[indices]
+    # Negated timestamps sort freshest first; NaT (int64 min) negates to itself,
+    # so push it to the end explicitly
+    discovered = columns.discovered_at[indices].view(np.int64)
+    freshness = np.where(discovered == np.iinfo(np.int64).min, np.iinfo(np.int64).max, -discovered)
+    return indices[np.lexsort((freshness, views))]
+
+
+def truncate_by_priority(columns, indices, max_size):
+    """The `max_size` best entries of `indices` by priority_order()"""
+    if len(indices) <= max_size:
+        return indices
+    return priority_order(columns, indices)[:max_size]
@@ -8,17 +8,30 @@ Performs 6 searches per run for geographic and language diversity.
 """
 
 import os
+import sys
 import json
 import random
 from datetime import datetime, timedelta
+import numpy as np
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+# Shard assignment is shared with the API nodes (api/sharding.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api'))
+from sharding import HashRing, parse_shard_nodes, shard_pool_file
+
+from pool_maintenance import (
+    PoolColumns, age_filter, least_recently_checked, split_refreshed,
+    drop, dedup_first, truncate_by_priority
+)
+
 # Configuration
 API_KEY = os.environ.get('YOUTUBE_API_KEY', '')
+YOUTUBE_API_ENDPOINT = os.environ.get('YOUTUBE_API_ENDPOINT', '')  # e.g. scripts/fake_youtube.py for offline runs
 POOL_FILE = 'videos_pool.json'
 SEARCH_TERMS_FILE = 'scripts/search_terms.txt'
-MAX_POOL_SIZE = 50000
+MAX_POOL_SIZE = int(os.environ.get('MAX_POOL_SIZE', 50000))  # Raise for sharded deployments
+SHARD_NODES = parse_shard_nodes(os.environ.get('SHARD_NODES', ''))  # Also write videos_pool.<shard>.json per shard
 MIN_POOL_SIZE = 1000  # Never delete videos if pool is below this
 
 # Search Configuration
@@ -30,6 +43,9 @@ SEARCHES_PER_RUN = 6  # Six searches per hour = 144 searches/day
 MAX_VIEW_COUNT = 100  # Only videos with 0-100 views
 MAX_VIDEO_AGE_HOURS = None  # Keep videos indefinitely (only remove when views exceed MAX_VIEW_COUNT)
 VIEW_CHECK_BATCH_SIZE = 50  # Check up to 50 videos per API call
+REFRESH_SAMPLE_SIZE = 200  # Minimum existing videos re-checked per run (4 videos.list calls = 4 quota units)
+REFRESH_CYCLE_RUNS = 24  # Re-check the whole pool every 24 hourly runs (~42 quota units/run at 50k videos)
+DEAD_VIDEO_MISS_LIMIT = 2  # Evict after this many consecutive checks where videos.list left the video out (one miss can be transient)
 
 
 def load_search_terms():
@@ -75,6 +91,37 @@ def save_pool(videos, stats=None):
 
     print(f"✓ Saved {len(videos)} videos to {POOL_FILE}")
 
+    if SHARD_NODES:
+        save_shard_pools(videos, data['last_updated'])
+
+
+def save_shard_pools(videos, last_updated):
+    """
+    Write one pool file per shard (same HashRing as the API nodes), so each
+    sharded node downloads and parses only its own slice
+    """
+    ring = HashRing(SHARD_NODES)
+    for shard, shard_videos in ring.split_videos(videos).items():
+        path = shard_pool_file(POOL_FILE, shard)
+        with open(path, 'w') as f:
+            json.dump({
+                'last_updated': last_updated,
+                'shard': shard,
+                'shard_nodes': SHARD_NODES,
+                'total_videos': len(shard_videos),
+                'videos': shard_videos
+            }, f, indent=2)
+        print(f"✓ Saved {len(shard_videos)} videos to {path}")
+
+
+def build_youtube_client():
+    """Build the YouTube API client, optionally against a custom endpoint"""
+    if YOUTUBE_API_ENDPOINT:
+        print(f"Using YouTube API endpoint: {YOUTUBE_API_ENDPOINT}")
+        return build('youtube', 'v3', developerKey=API_KEY,
+                     client_options={'api_endpoint': YOUTUBE_API_ENDPOINT})
+    return build('youtube', 'v3', developerKey=API_KEY)
+
 
 def get_published_after():
     """Get the timestamp for filtering recent videos"""
@@ -151,7 +198,8 @@ def batch_check_view_counts(youtube, video_ids):
                     'thumbnail': item['snippet']['thumbnails']['medium']['url'],
                     'viewCount': view_count,
                     'publishedAt': item['snippet']['publishedAt'],
-                    'discoveredAt': datetime.utcnow().isoformat() + 'Z'
+                    'discoveredAt': datetime.utcnow().isoformat() + 'Z',
+                    'lastCheckedAt': datetime.utcnow().isoformat() + 'Z'
                 }
                 low_view_videos.append(video_data)
                 print(f"  ✓ {video_data['title'][:50]} ({view_count} views)")
@@ -168,85 +216,107 @@ def update_existing_videos(youtube, existing_videos):
     """
     Update view counts for existing videos in the pool.
     Uses smart batching to minimize API calls.
+    Videos that videos.list leaves out (deleted or private) are evicted.
+
+    Returns:
+        (columns, remaining_indices, dead_videos_removed) where columns is the
+        pool as PoolColumns (refreshed view counts applied) and
+        remaining_indices the rows that stay in the pool
     """
+    columns = PoolColumns(existing_videos)
     if not existing_videos:
-        return []
+        return columns, np.arange(0), 0
 
     print(f"\nUpdating view counts for {len(existing_videos)} existing videos...")
 
-    # Calculate age of each video
-    now = datetime.utcnow()
-    fresh_videos = []
-
-    for video in existing_videos:
-        discovered_at = datetime.fromisoformat(video['discoveredAt'].replace('Z', ''))
-        age_hours = (now - discovered_at).total_seconds() / 3600
+    # The pool is loaded into typed columns once; the passes below (and main())
+    # work on index arrays
+    fresh = age_filter(columns, datetime.utcnow(), MAX_VIDEO_AGE_HOURS)
 
-        # Remove videos older than MAX_VIDEO_AGE_HOURS (if age limit is set)
-        if MAX_VIDEO_AGE_HOURS is not None and age_hours > MAX_VIDEO_AGE_HOURS:
-            continue
+    if len(fresh) < len(existing_videos):
+        removed = len(existing_videos) - len(fresh)
+        print(f"  Removed {removed} videos older than {MAX_VIDEO_AGE_HOURS} hours")
 
-        fresh_videos.append(video)
-
-    if len(fresh_videos) < len(existing_videos):
-        removed = len(existing_videos) - len(fresh_videos)
-        if MAX_VIDEO_AGE_HOURS is not None:
-            print(f"  Removed {removed} videos older than {MAX_VIDEO_AGE_HOURS} hours")
-        else:
-            print(f"  Kept all {len(fresh_videos)} videos (no age limit)")
-
-    # Batch check view counts for a sample of fresh videos
-    # To save quota, we only check a portion each run
-    if len(fresh_videos) > 200:
-        # Sample random videos to check
-        sample_size = min(200, len(fresh_videos))
-        videos_to_check = random.sample(fresh_videos, sample_size)
-    else:
-        videos_to_check = fresh_videos
+    # Batch check view counts for the least recently checked videos.
+    # Rotating through the pool this way means every video (including ones that
+    # were deleted or made private) is eventually re-checked, so dead entries get
+    # pruned instead of piling up. Never-checked videos sort first.
+    refresh_size = max(REFRESH_SAMPLE_SIZE, -(-len(fresh) // REFRESH_CYCLE_RUNS))
+    to_check = least_recently_checked(columns, fresh, refresh_size)
 
-    print(f"  Checking view counts for {len(videos_to_check)} sampled videos...")
+    print(f"  Checking view counts for {len(to_check)} least recently checked videos...")
 
-    video_ids = [v['id'] for v in videos_to_check]
-    updated_views = {}
+    video_ids = columns.ids[to_check].tolist()
+    updated_ids = []
+    updated_views = []
+    missing_ids = set()
+    checked_at = datetime.utcnow().isoformat() + 'Z'
 
-    try:
-        # Batch check in groups of 50
-        for i in range(0, len(video_ids), VIEW_CHECK_BATCH_SIZE):
-            batch = video_ids[i:i + VIEW_CHECK_BATCH_SIZE]
+    # Batch check in groups of 50
+    for i in range(0, len(video_ids), VIEW_CHECK_BATCH_SIZE):
+        batch = video_ids[i:i + VIEW_CHECK_BATCH_SIZE]
 
+        try:
             videos_response = youtube.videos().list(
                 part='statistics',
                 id=','.join(batch)
             ).execute()
+        except HttpError as e:
+            # Only batches that came back are used for eviction decisions
+            print(f"  ERROR updating view counts: {e}")
+            if 'quota' in str(e).lower():
+                print("  QUOTA EXCEEDED - skipping remaining refresh batches")
+                break
+            continue
 
-            for item in videos_response.get('items', []):
-                video_id = item['id']
-                view_count = int(item['statistics'].get('viewCount', 0))
-                updated_views[video_id] = view_count
-
-        print(f"  ✓ Updated view counts for {len(updated_views)} videos")
-
-    except HttpError as e:
-        print(f"  ERROR updating view counts: {e}")
-
-    # Filter out videos that now have > MAX_VIEW_COUNT views
-    final_videos = []
-    removed_count = 0
-
-    for video in fresh_videos:
-        if video['id'] in updated_views:
-            new_view_count = updated_views[video['id']]
-            if new_view_count > MAX_VIEW_COUNT:
-                removed_count += 1
-                continue
-            video['viewCount'] = new_view_count
+        returned_ids = set()
+        for item in videos_response.get('items', []):
+            updated_ids.append(item['id'])
+            updated_views.append(int(item['statistics'].get('viewCount', 0)))
+            returned_ids.add(item['id'])
+
+        # videos.list silently leaves out deleted and private videos
+        missing_ids.update(vid for vid in batch if vid not in returned_ids)
+
+    print(f"  ✓ Updated view counts for {len(updated_ids)} videos")
+    if missing_ids:
+        print(f"  {len(missing_ids)} videos missing from API response (deleted or private)")
+
+    # Evict videos that now have > MAX_VIEW_COUNT views
+    refreshed, refreshed_views, over_limit = split_refreshed(
+        columns, to_check, updated_ids, updated_views, MAX_VIEW_COUNT
+    )
+    for index, view_count in zip(refreshed.tolist(), refreshed_views.tolist()):
+        video = existing_videos[index]
+        video['viewCount'] = view_count
+        video['lastCheckedAt'] = checked_at
+        video.pop('missingChecks', None)
+    # Keep the columns in step with the dicts for truncation in main()
+    columns.view_count[refreshed] = refreshed_views
+
+    # Evict videos that have been missing DEAD_VIDEO_MISS_LIMIT times
+    dead = []
+    for index in to_check.tolist():
+        video = existing_videos[index]
+        if video['id'] not in missing_ids:
+            continue
+        misses = video.get('missingChecks', 0) + 1
+        if misses >= DEAD_VIDEO_MISS_LIMIT:
+            dead.append(index)
+            continue
+        # lastCheckedAt stays as it was, so the video is first in line next run
+        video['missingChecks'] = misses
 
-        final_videos.append(video)
+    remaining = drop(fresh, np.concatenate([over_limit, dead]).astype(np.intp))
+    removed_count = len(over_limit)
+    dead_count = len(dead)
 
     if removed_count > 0:
         print(f"  Removed {removed_count} videos that exceeded {MAX_VIEW_COUNT} views")
+    if dead_count > 0:
+        print(f"  Removed {dead_count} dead videos (deleted or private)")
 
-    return final_videos
+    return columns, remaining, dead_count
 
 
 def main():
@@ -260,7 +330,7 @@ def main():
         print("ERROR: YOUTUBE_API_KEY environment variable not set")
         return
 
-    youtube = build('youtube', 'v3', developerKey=API_KEY)
+    youtube = build_youtube_client()
 
     # Load search terms
     search_terms = load_search_terms()
@@ -270,9 +340,14 @@ def main():
     existing_videos = load_pool()
     print(f"Loaded {len(existing_videos)} existing videos from pool")
 
+    # Update existing videos first (check view counts, remove popular/dead): it costs
+    # a few quota units, and searches that run out of quota later can't starve it
+    columns, remaining, dead_removed = update_existing_videos(youtube, existing_videos)
+
     # Search for new videos (perform multiple searches with different terms)
     print(f"\nPerforming {SEARCHES_PER_RUN} searches for videos uploaded in last {SEARCH_WINDOW_HOURS} hour(s)...")
     all_new_video_ids = []
+    seen_new_ids = set()
     existing_ids = {v['id'] for v in existing_videos}
 
     # Randomly select search terms for diversity
@@ -284,7 +359,8 @@ def main():
 
         # Filter out duplicates and already-existing IDs
         for vid in video_ids:
-            if vid not in existing_ids and vid not in all_new_video_ids:
+            if vid not in existing_ids and vid not in seen_new_ids:
+                seen_new_ids.add(vid)
                 all_new_video_ids.append(vid)
 
     print(f"\n✓ Total unique new videos found: {len(all_new_video_ids)}")
@@ -305,38 +381,28 @@ def main():
         print("No new videos found")
         new_videos = []
 
-    # Update existing videos (check view counts, remove old/popular)
-    updated_existing = update_existing_videos(youtube, existing_videos)
-
-    # Combine and deduplicate
-    all_videos = updated_existing + new_videos
-
-    # Deduplicate just in case
-    seen = set()
-    unique_videos = []
-    for video in all_videos:
-        if video['id'] not in seen:
-            seen.add(video['id'])
-            unique_videos.append(video)
+    # Combine and deduplicate (first occurrence wins); only the new rows get parsed
+    combined = np.concatenate([remaining, columns.append(new_videos)])
+    keep = combined[dedup_first(columns.ids[combined])]
 
     # Safety check: Never delete if pool is too small
-    if len(unique_videos) < MIN_POOL_SIZE and len(existing_videos) >= MIN_POOL_SIZE:
+    if len(keep) < MIN_POOL_SIZE and len(existing_videos) >= MIN_POOL_SIZE:
         print(f"\n⚠️  WARNING: Pool would drop below {MIN_POOL_SIZE} videos")
         print(f"   Keeping existing pool to prevent data loss")
-        unique_videos = existing_videos
+        keep = np.arange(len(existing_videos))  # The existing pool's rows come first
 
-    # Shuffle for randomness
-    random.shuffle(unique_videos)
+    # Limit to MAX_POOL_SIZE, keeping the lowest-view and freshest videos
+    if len(keep) > MAX_POOL_SIZE:
+        print(f"\nLimiting pool to {MAX_POOL_SIZE} videos (had {len(keep)})")
+        keep = truncate_by_priority(columns, keep, MAX_POOL_SIZE)
 
-    # Limit to MAX_POOL_SIZE
-    if len(unique_videos) > MAX_POOL_SIZE:
-        print(f"\nLimiting pool to {MAX_POOL_SIZE} videos (had {len(unique_videos)})")
-        unique_videos = unique_videos[:MAX_POOL_SIZE]
+    unique_videos = columns.take(keep)
 
     # Save to file
     stats = {
         'new_videos_added': len(new_videos),
-        'videos_removed': len(existing_videos) - len(updated_existing),
+        'videos_removed': len(existing_videos) - len(remaining),
+        'dead_videos_removed': dead_removed,
         'total_in_pool': len(unique_videos)
     }
 
@@ -346,6 +412,7 @@ def main():
     print("Discovery Complete!")
     print(f"  New videos added: {stats['new_videos_added']}")
     print(f"  Videos removed: {stats['videos_removed']}")
+    print(f"  Dead videos removed: {stats['dead_videos_removed']}")
     print(f"  Total in pool: {stats['total_in_pool']}")
     print("="*60)
 
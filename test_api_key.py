@@ -2,6 +2,7 @@
 """
 Quick test script to verify YouTube API key works correctly.
 Run with: YOUTUBE_API_KEY=your_key_here python test_api_key.py
+Offline: YOUTUBE_API_ENDPOINT=http://127.0.0.1:8765/youtube/v3/ YOUTUBE_API_KEY=fake python test_api_key.py
 """
 
 import os
@@ -10,6 +11,9 @@ from googleapiclient.errors import HttpError
 from datetime import datetime, timedelta
 
 API_KEY = os.environ.get('YOUTUBE_API_KEY', '')
+# Point at scripts/fake_youtube.py to run without burning real quota
+API_ENDPOINT = os.environ.get('YOUTUBE_API_ENDPOINT', '')
+CLIENT_OPTIONS = {'api_endpoint': API_ENDPOINT} if API_ENDPOINT else None
 
 if not API_KEY:
     print("❌ ERROR: YOUTUBE_API_KEY environment variable not set")
@@ -21,7 +25,7 @@ print(f"Key: {API_KEY[:8]}...{API_KEY[-4:]}")
 print()
 
 try:
-    youtube = build('youtube', 'v3', developerKey=API_KEY)
+    youtube = build('youtube', 'v3', developerKey=API_KEY, client_options=CLIENT_OPTIONS)
 
     # Try a simple search
     published_after = (datetime.utcnow() - timedelta(hours=6)).isoformat() + 'Z'
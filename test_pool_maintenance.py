@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the vectorized pool maintenance passes
+(scripts/pool_maintenance.py) match the per-video loops they replaced
+in video_discovery.py, on a synthetic pool
+"""
+
+import sys
+import os
+import heapq
+import random
+from datetime import datetime, timedelta
+
+# Add scripts directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+
+import numpy as np
+from pool_maintenance import PoolColumns, age_filter, least_recently_checked, split_refreshed, dedup_first
+
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def synthetic_pool(size=5000, seed=0):
+    """Pool with duplicate IDs, never-checked videos and spread-out timestamps"""
+    rng = random.Random(seed)
+    ids = [f'vid{i:08d}' for i in range(size * 4 // 5)]
+    videos = []
+    for _ in range(size):
+        discovered = NOW - timedelta(seconds=rng.randint(0, 96 * 3600), microseconds=rng.randint(0, 999999))
+        video = {
+            'id': rng.choice(ids),
+            'viewCount': rng.randint(0, 150),
+            'discoveredAt': discovered.isoformat() + 'Z',
+        }
+        if rng.random() < 0.8:
+            checked = discovered + timedelta(seconds=rng.randint(0, 3600), microseconds=rng.randint(0, 999999))
+            video['lastCheckedAt'] = checked.isoformat() + 'Z'
+        videos.append(video)
+    return videos
+
+
+# Loops as they were in video_discovery.py before pool_maintenance.py
+
+def loop_age_filter(videos, now, max_age_hours):
+    fresh = []
+    for index, video in enumerate(videos):
+        discovered_at = datetime.fromisoformat(video['discoveredAt'].replace('Z', ''))
+        age_hours = (now - discovered_at).total_seconds() / 3600
+        if max_age_hours is not None and age_hours > max_age_hours:
+            continue
+        fresh.append(index)
+    return fresh
+
+
+def loop_least_recently_checked(videos, indices, count):
+    if len(indices) <= count:
+        return list(indices)
+    return heapq.nsmallest(count, indices, key=lambda i: videos[i].get('lastCheckedAt', ''))
+
+
+def loop_split_refreshed(videos, indices, updated_views, max_view_count):
+    refreshed, views, over_limit = [], [], []
+    for index in indices:
+        video_id = videos[index]['id']
+        if video_id in updated_views:
+            if updated_views[video_id] > max_view_count:
+                over_limit.append(index)
+                continue
+            refreshed.append(index)
+            views.append(updated_views[video_id])
+    return refreshed, views, over_limit
+
+
+def loop_dedup_first(ids):
+    seen = set()
+    first = []
+    for index, video_id in enumerate(ids):
+        if video_id not in seen:
+            seen.add(video_id)
+            first.append(index)
+    return first
+
+
+def test_age_filter():
+    videos = synthetic_pool()
+    columns = PoolColumns(videos)
+    for max_age_hours in (None, 1, 6, 24, 48, 200):
+        assert age_filter(columns, NOW, max_age_hours).tolist() == loop_age_filter(videos, NOW, max_age_hours), max_age_hours
+
+
+def test_least_recently_checked():
+    videos = synthetic_pool()
+    columns = PoolColumns(videos)
+    indices = np.arange(len(videos))
+    for count in (0, 1, 200, len(videos) - 1, len(videos)):
+        vectorized = least_recently_checked(columns, indices, count).tolist()
+        expected = loop_least_recently_checked(videos, indices.tolist(), count)
+        # Same lastCheckedAt values selected; which of several never-checked
+        # (or equally old) videos gets picked may differ
+        key = lambda i: videos[i].get('lastCheckedAt', '')
+        assert sorted(map(key, vectorized)) == sorted(map(key, expected)), count
+
+
+def test_split_refreshed():
+    rng = random.Random(1)
+    videos = synthetic_pool()
+    columns = PoolColumns(videos)
+    indices = np.array(rng.sample(range(len(videos)), 600))
+    # videos.list returns each requested ID at most once, leaving some out
+    requested = list(dict.fromkeys(videos[i]['id'] for i in indices.tolist()))
+    updated_views = {vid: rng.randint(0, 200) for vid in requested if rng.random() < 0.9}
+
+    refreshed, views, over_limit = split_refreshed(
+        columns, indices, list(updated_views), list(updated_views.values()), 100
+    )
+    expected = loop_split_refreshed(videos, indices.tolist(), updated_views, 100)
+    assert (refreshed.tolist(), views.tolist(), over_limit.tolist()) == expected
+
+
+def test_dedup_first():
+    videos = synthetic_pool()
+    ids = [v['id'] for v in videos]
+    assert dedup_first(np.array(ids, dtype=str)).tolist() == loop_dedup_first(ids)
+    assert dedup_first(np.array([], dtype=str)).tolist() == []
+
+
+def test_append():
+    videos = synthetic_pool()
+    columns = PoolColumns(videos[:3000])
+    added = columns.append(videos[3000:])
+    full = PoolColumns(videos)
+    assert added.tolist() == list(range(3000, len(videos)))
+    assert columns.ids.tolist() == full.ids.tolist()
+    assert columns.view_count.tolist() == full.view_count.tolist()
+    assert columns.discovered_at.tolist() == full.discovered_at.tolist()
+    assert np.array_equal(columns.last_checked_at, full.last_checked_at, equal_nan=True)
+
+
+if __name__ == '__main__':
+    print("="*60)
+    print("Testing Pool Maintenance Against the Original Loops")
+    print("="*60)
+
+    for test in (test_age_filter, test_least_recently_checked, test_split_refreshed, test_dedup_first, test_append):
+        test()
+        print(f"✓ {test.__name__[len('test_'):]} matches")
+
+    print("\n" + "="*60)
+    print("✓ Pool maintenance passes match the original loops!")
@@ -9,12 +9,15 @@ from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
 API_KEY = os.environ.get('YOUTUBE_API_KEY', '')
+# Point at scripts/fake_youtube.py to run without burning real quota
+API_ENDPOINT = os.environ.get('YOUTUBE_API_ENDPOINT', '')
+CLIENT_OPTIONS = {'api_endpoint': API_ENDPOINT} if API_ENDPOINT else None
 
 if not API_KEY:
     print("❌ ERROR: YOUTUBE_API_KEY not set")
     exit(1)
 
-youtube = build('youtube', 'v3', developerKey=API_KEY)
+youtube = build('youtube', 'v3', developerKey=API_KEY, client_options=CLIENT_OPTIONS)
 published_after = (datetime.utcnow() - timedelta(hours=6)).isoformat() + 'Z'
 
 print("="*60)